@@ -0,0 +1,74 @@
+from iff.service import identifiers, read_services, split_services
+from iff.service import ServiceRecord, ServiceNumberRecord, FootnoteRecord, TransportModeRecord, AttributeRecord, PlatformRecord
+from iff.model import Stop
+from iff.parallel import ReferenceContext
+from benchmarks.synthetic import write_timetable
+
+import argparse
+import os
+import tempfile
+import time
+
+# Read services by decoding every line to a Record first, as the reader did before the column layouts
+def read_services_by_records(strings, context):
+  current_service = None
+  current_stop = None
+
+  for string in strings:
+    record = identifiers[string[0]].read(string,context)
+
+    if isinstance(record,ServiceRecord):
+      if current_service is not None:
+        yield from split_services(current_service)
+      current_service = record
+      current_stop = None
+    elif isinstance(record,ServiceNumberRecord):
+      current_service.service_numbers.append(record)
+    elif isinstance(record,FootnoteRecord):
+      current_service.footnote = record.footnote
+    elif isinstance(record,TransportModeRecord):
+      current_service.transport_mode = record.transport_mode
+    elif isinstance(record,AttributeRecord):
+      current_service.attributes.append(record.attribute)
+    elif isinstance(record,PlatformRecord):
+      current_stop.arrival_platform = record.arrival_platform_name
+      current_stop.departure_platform = record.departure_platform_name
+    else:
+      current_stop = Stop(**record.__dict__)
+      current_service.stops.append(current_stop)
+
+  if current_service is not None:
+    yield from split_services(current_service)
+
+# Return the number of lines per second a reader decodes from a file
+def measure(reader, file_name):
+  with open(file_name) as file:
+    next(file)
+    strings = file.readlines()
+
+  start = time.perf_counter()
+  for service in reader(strings,ReferenceContext()):
+    pass
+  return len(strings) / (time.perf_counter() - start)
+
+
+# Main function
+def main():
+  parser = argparse.ArgumentParser(description = "Benchmark the TIMETBLS decoder on a synthetic file")
+  parser.add_argument('--stations',type = int,default = 400)
+  parser.add_argument('--services',type = int,default = 20000)
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as directory:
+    file_name = os.path.join(directory,"timetbls.dat")
+    write_timetable(file_name,args.stations,args.services)
+
+    before = measure(read_services_by_records,file_name)
+    after = measure(read_services,file_name)
+    print("records:        {:>10,.0f} lines/s".format(before))
+    print("column layouts: {:>10,.0f} lines/s ({:.1f}x)".format(after,after / before))
+
+
+# Execute the main function
+if __name__ == '__main__':
+  main()
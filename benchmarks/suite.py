@@ -0,0 +1,78 @@
+from iff import IFF
+from iff.parser import Date, Time
+from benchmarks.synthetic import FIRST_DAY, write_delivery
+
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+
+# Default scales as stations, services and days
+SCALES = [(50,1000,30), (200,10000,90), (400,40000,365)]
+
+
+# Return the scale for a command line argument
+def scale(string):
+  stations, services, days = (int(value) for value in string.split(','))
+  return (stations,services,days)
+
+# Measure a delivery and return the results
+def measure(directory, queries, seed = 0):
+  results = {}
+
+  # Measure the load time, reading all files now because they are read lazily otherwise
+  start = time.perf_counter()
+  iff = IFF(directory,lazy = False)
+  results['load'] = time.perf_counter() - start
+
+  # Measure the peak memory of a second load
+  tracemalloc.start()
+  IFF(directory,lazy = False)
+  results['memory'] = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+
+  # Measure the first query, which builds the lookups, and the average query
+  generator = random.Random(seed)
+  stations = list(iff.stations.values())
+  day = Date(FIRST_DAY.year,FIRST_DAY.month,FIRST_DAY.day)
+
+  start = time.perf_counter()
+  iff.services.timetable_stops_at(day,stations[0])
+  results['first_query'] = time.perf_counter() - start
+
+  start = time.perf_counter()
+  for query in range(queries):
+    iff.services.timetable_stops_at(day,generator.choice(stations),Time(7,0),Time(10,0))
+  results['query'] = (time.perf_counter() - start) / queries
+
+  return results
+
+
+# Main function
+def main():
+  parser = argparse.ArgumentParser(description = "Benchmark loading and querying synthetic IFF deliveries")
+  parser.add_argument('--scale',type = scale,action = 'append',help = "stations,services,days (repeatable)")
+  parser.add_argument('--queries',type = int,default = 1000)
+  args = parser.parse_args()
+
+  print("{:>8} {:>8} {:>5}  {:>8} {:>10} {:>12} {:>10}".format('stations','services','days','load s','peak MB','first query','query us'))
+  for stations, services, days in args.scale or SCALES:
+    with tempfile.TemporaryDirectory() as directory:
+      write_delivery(directory,stations,services,days)
+      results = measure(directory,args.queries)
+
+    print("{:>8} {:>8} {:>5}  {:>8.2f} {:>10.1f} {:>10.1f}ms {:>10.1f}".format(
+      stations,
+      services,
+      days,
+      results['load'],
+      results['memory'] / 1048576,
+      results['first_query'] * 1000,
+      results['query'] * 1000000
+    ))
+
+
+# Execute the main function
+if __name__ == '__main__':
+  main()
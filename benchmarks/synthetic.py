@@ -0,0 +1,106 @@
+from datetime import date, timedelta
+
+import os
+import random
+
+# Transport modes, attributes and platforms used by the synthetic services
+TRANSPORT_MODES = [('IC', 'Intercity'), ('SPR', 'Sprinter')]
+ATTRIBUTES = [('ROL', 'Rolstoeltoegankelijk'), ('FIE', 'Fietsen toegestaan')]
+PLATFORMS = ['1', '2', '3', '4', '5a', '5b']
+
+# Default first day of a synthetic delivery
+FIRST_DAY = date(2018,1,1)
+
+
+# Return the identification record line of a delivery
+def identification_record(first_day, last_day, version = 1):
+  return "@100,{:%d%m%Y},{:%d%m%Y},{:04d},{:<30}\n".format(first_day,last_day,version,"Synthetic delivery")
+
+# Return the station codes for a number of stations
+def station_codes(stations):
+  return ["st{}".format(station_idx) for station_idx in range(stations)]
+
+# Write a synthetic TIMETBLS file
+def write_timetable(file_name, stations = 100, services = 1000, footnotes = 10, seed = 0, first_day = FIRST_DAY, days = 365, version = 1):
+  generator = random.Random(seed)
+  codes = station_codes(stations)
+
+  with open(file_name,'w') as file:
+    # Write the identification record
+    file.write(identification_record(first_day,first_day + timedelta(days = days - 1),version))
+
+    # Write the services
+    for service_idx in range(services):
+      route = generator.sample(codes,generator.randint(3,min(15,stations)))
+      time = generator.randint(300,1380)
+
+      # Write the service records
+      file.write("#{:08d}\n".format(service_idx + 1))
+      file.write("%100,{:05d},      ,001,999,{:<30}\n".format(service_idx % 100000,''))
+      file.write("-{:05d},000,999\n".format(generator.randint(1,footnotes)))
+      file.write("&{:<4},000,999\n".format(generator.choice(TRANSPORT_MODES)[0]))
+      file.write("*{:<4},000,999\n".format(generator.choice(ATTRIBUTES)[0]))
+
+      # Write the stop records
+      for stop_idx, code in enumerate(route):
+        if stop_idx == 0:
+          file.write(">{:<7},{:02d}{:02d}\n".format(code,time // 60,time % 60))
+        elif stop_idx == len(route) - 1:
+          file.write("<{:<7},{:02d}{:02d}\n".format(code,time // 60,time % 60))
+        elif generator.random() < 0.2:
+          file.write(";{:<7}\n".format(code))
+          time += generator.randint(1,3)
+          continue
+        elif generator.random() < 0.5:
+          file.write(".{:<7},{:02d}{:02d}\n".format(code,time // 60,time % 60))
+        else:
+          file.write("+{:<7},{:02d}{:02d},{:02d}{:02d}\n".format(code,time // 60,time % 60,(time + 1) // 60,(time + 1) % 60))
+          time += 1
+
+        # Write the platform record
+        platform = generator.choice(PLATFORMS)
+        file.write("?{:<5},{:<5},{:05d}\n".format(platform,platform,1))
+        time += generator.randint(2,15)
+
+# Write a complete synthetic delivery to a directory
+def write_delivery(directory, stations = 100, services = 1000, days = 365, footnotes = 20, seed = 0, first_day = FIRST_DAY, version = 1):
+  generator = random.Random(seed)
+  last_day = first_day + timedelta(days = days - 1)
+  header = identification_record(first_day,last_day,version)
+  os.makedirs(directory,exist_ok = True)
+
+  # Write a file with the identification record and lines
+  def write_file(name, lines):
+    with open(os.path.join(directory,name),'w') as file:
+      file.write(header)
+      for line in lines:
+        file.write(line + "\n")
+
+  # Write the reference files
+  write_file("delivery.dat",[])
+  write_file("trnsattr.dat",["{:<4},{:04d},{:<30}".format(code,idx,description) for idx, (code, description) in enumerate(ATTRIBUTES)])
+  write_file("timezone.dat",["#0000","+00,{:%d%m%Y},{:%d%m%Y}".format(first_day,last_day)])
+  write_file("country.dat",["NL  ,1,{:<30}".format("Nederland")])
+  write_file("company.dat",["100,{:<10},{:<30},0400".format("ns","NS")])
+  write_file("trnsmode.dat",["{:<4},{:<30}".format(code,description) for code, description in TRANSPORT_MODES])
+
+  # Write the stations, with their Rijksdriehoek coordinates in kilometers like the STATIONS files of NS
+  write_file("stations.dat",["1,{:<7},{:02d},{:02d},{:<4},{:04d},0,{:07d},{:06d},{:<30}".format(
+    code,
+    generator.randint(2,5),
+    generator.randint(5,9),
+    "NL",
+    0,
+    generator.randint(13,278),
+    generator.randint(306,619),
+    "Station {}".format(station_idx)
+  ) for station_idx, code in enumerate(station_codes(stations))])
+
+  # Write the footnotes
+  write_file("footnote.dat",[line for footnote in range(1,footnotes + 1) for line in (
+    "#{:05d}".format(footnote),
+    "".join(generator.choice('01') for day in range(days))
+  )])
+
+  # Write the timetable
+  write_timetable(os.path.join(directory,"timetbls.dat"),stations,services,footnotes,seed,first_day,days,version)
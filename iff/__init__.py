@@ -7,50 +7,107 @@ from iff.country import CountryFile
 from iff.company import CompanyFile
 from iff.attribute import AttributeFile
 from iff.timezone import TimezoneFile
+from iff.parallel import read_services_parallel
+from iff.cache import snapshot_file_name_for, read_snapshot, write_snapshot
+from iff.stats import LoadStats, count_lines
+
+import os
+import threading
+
+# Lock that prevents files from being read twice by concurrent first accesses
+_lock = threading.RLock()
+
+
+# Read the TIMETBLS file, using a pool of processes if requested
+def _read_services(file_name, context):
+  if context.processes is not None:
+    return read_services_parallel(file_name,context,context.processes)
+  else:
+    return ServiceFile.read(file_name,context,context.compact)
+
+
+# Lazy file class, which reads a file of the delivery on first access
+class LazyFile:
+  # Constructor
+  def __init__(self, file_name, description, read, validate = True):
+    self.file_name = file_name
+    self.description = description
+    self.read = read
+    self.validate = validate
+
+  # Set the name of the attribute
+  def __set_name__(self, owner, name):
+    self.name = name
+
+  # Read the file and store it on the instance, so later accesses bypass this descriptor
+  def __get__(self, instance, owner):
+    if instance is None:
+      return self
+
+    with _lock:
+      # Check if the file was read while waiting for the lock
+      if self.name in instance.__dict__:
+        return instance.__dict__[self.name]
+
+      # Read the file, which reads the files it depends on through the instance
+      file_name = os.path.join(instance.directory,self.file_name)
+      if instance.stats is not None:
+        with instance.stats.measure(self.name,file_name) as file_stats:
+          file = self.read(file_name,instance)
+        file_stats.lines = count_lines(file_name)
+        file_stats.records = len(file) if hasattr(file,'__len__') else 1
+      else:
+        file = self.read(file_name,instance)
+      if self.validate and not file.is_valid(instance.delivery):
+        raise RuntimeError("The {} file is not valid".format(self.description))
+
+      instance.__dict__[self.name] = file
+      return file
+
 
 # IFF main class
 class IFF:
+  # Files of the delivery in dependency order, which are read on first access
+  delivery = LazyFile("delivery.dat","DELIVERY",DeliveryFile.read,validate = False)
+  attributes = LazyFile("trnsattr.dat","TRNSATTR",AttributeFile.read)
+  timezones = LazyFile("timezone.dat","TIMEZONE",TimezoneFile.read)
+  countries = LazyFile("country.dat","COUNTRY",CountryFile.read)
+  companies = LazyFile("company.dat","COMPANY",CompanyFile.read)
+  stations = LazyFile("stations.dat","STATIONS",StationFile.read)
+  footnotes = LazyFile("footnote.dat","FOOTNOTE",FootnoteFile.read)
+  transport_modes = LazyFile("trnsmode.dat","TRNSMODE",TransportModeFile.read)
+  services = LazyFile("timetbls.dat","TIMETBLS",_read_services)
+
   # Constructor
-  def __init__(self, directory):
-    # Read the DELIVERY file
-    self.delivery = DeliveryFile.read("{}/delivery.dat".format(directory),self)
-
-    # Read the TRNSATTR file
-    self.attributes = AttributeFile.read("{}/trnsattr.dat".format(directory),self)
-    if not self.attributes.is_valid(self.delivery):
-      raise RuntimeException("The TRNSATTR file is not valid")
-
-    # Read the TIMEZONE file
-    self.timezones = TimezoneFile.read("{}/timezone.dat".format(directory),self)
-    if not self.timezones.is_valid(self.delivery):
-      raise RuntimeException("The TIMEZONE file is not valid")
-
-    # Read the COUNTRY file
-    self.countries = CountryFile.read("{}/country.dat".format(directory),self)
-    if not self.countries.is_valid(self.delivery):
-      raise RuntimeException("The COUNTRY file is not valid")
-
-    # Read the COMPANY file
-    self.companies = CompanyFile.read("{}/company.dat".format(directory),self)
-    if not self.companies.is_valid(self.delivery):
-      raise RuntimeException("The COMPANY file is not valid")
-
-    # Read the STATIONS file
-    self.stations = StationFile.read("{}/stations.dat".format(directory),self)
-    if not self.stations.is_valid(self.delivery):
-      raise RuntimeException("The STATIONS file is not valid")
-
-    # Read the FOOTNOTE file
-    self.footnotes = FootnoteFile.read("{}/footnote.dat".format(directory),self)
-    if not self.footnotes.is_valid(self.delivery):
-      raise RuntimeException("The FOOTNOTE file is not valid")
-
-    # Read the TRNSMODE file
-    self.transport_modes = TransportModeFile.read("{}/trnsmode.dat".format(directory),self)
-    if not self.transport_modes.is_valid(self.delivery):
-      raise RuntimeException("The TRNSMODE file is not valid")
-
-    # Read the TIMETBLS file
-    self.services = ServiceFile.read("{}/timetbls.dat".format(directory),self)
-    if not self.services.is_valid(self.delivery):
-      raise RuntimeException("The TIMETBLS file is not valid")
+  def __init__(self, directory, processes = None, compact = False, lazy = True, profile = False):
+    self.directory = directory
+    self.processes = processes
+
+    # Store the stops compactly if requested, which reading with processes always does
+    self.compact = compact or processes is not None
+    self.stats = profile if isinstance(profile,LoadStats) else LoadStats() if profile else None
+
+    # Read all files now if the delivery should not be read lazily
+    if not lazy:
+      self.read_all()
+
+  # Read all files that are not read yet
+  def read_all(self):
+    for name in ('delivery','attributes','timezones','countries','companies','stations','footnotes','transport_modes','services'):
+      getattr(self,name)
+    return self
+
+  # Load a delivery, using a snapshot in the cache directory if one exists
+  @classmethod
+  def load(cls, directory, cache_dir = None, processes = None, compact = False):
+    # Read the delivery directly if there is no cache directory
+    if cache_dir is None:
+      return cls(directory,processes,compact)
+
+    # Read the snapshot for this delivery, or create it, naming it compact if the stops are stored compactly, which reading with processes always does
+    file_name = snapshot_file_name_for(cache_dir,directory,compact or processes is not None)
+    iff = read_snapshot(file_name)
+    if iff is None:
+      iff = cls(directory,processes,compact,lazy = False)
+      write_snapshot(file_name,iff)
+    return iff
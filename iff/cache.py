@@ -0,0 +1,91 @@
+from iff.delivery import DeliveryFile
+
+import glob
+import mmap
+import os
+import pickle
+import tempfile
+
+# Snapshot constants, bump the version when the pickled classes change
+SNAPSHOT_MAGIC = b'IFFSNAP'
+SNAPSHOT_VERSION = 3
+
+# Errors that unpickling a truncated or incompatible snapshot raises
+SNAPSHOT_ERRORS = (pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError, TypeError, ValueError)
+
+
+# Return the snapshot file name for a delivery identification record
+def snapshot_file_name(cache_dir, identification_record, compact = False):
+  return os.path.join(cache_dir,"iff-{:03d}-{:%Y%m%d}-{:%Y%m%d}-{:04d}{}.v{}.snapshot".format(
+    identification_record.company_number,
+    identification_record.first_day,
+    identification_record.last_day,
+    identification_record.version_number,
+    "-compact" if compact else "",
+    SNAPSHOT_VERSION
+  ))
+
+# Return the snapshot file name for a delivery directory
+def snapshot_file_name_for(cache_dir, directory, compact = False):
+  delivery = DeliveryFile.read(os.path.join(directory,"delivery.dat"),None)
+  return snapshot_file_name(cache_dir,delivery.identification_record,compact)
+
+# Read a snapshot, or return None if it does not exist or cannot be read, removing an unreadable snapshot so it is written again
+def read_snapshot(file_name):
+  try:
+    file = open(file_name,'rb')
+  except FileNotFoundError:
+    return None
+
+  # Map the file into memory to unpickle it without reading it into a buffer first, which still creates every object
+  try:
+    with file, mmap.mmap(file.fileno(),0,access = mmap.ACCESS_READ) as buffer:
+      if buffer[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise pickle.UnpicklingError("Invalid snapshot header")
+
+      view = memoryview(buffer)
+      try:
+        return pickle.loads(view[len(SNAPSHOT_MAGIC):])
+      finally:
+        view.release()
+
+  # Treat a truncated snapshot or a snapshot of changed classes as missing
+  except SNAPSHOT_ERRORS:
+    try:
+      os.remove(file_name)
+    except FileNotFoundError:
+      pass
+    return None
+
+# Write a snapshot atomically
+def write_snapshot(file_name, object):
+  directory = os.path.dirname(file_name) or '.'
+  os.makedirs(directory,exist_ok = True)
+
+  # Write to a temporary file first, then move it in place
+  descriptor, temp_file_name = tempfile.mkstemp(dir = directory,suffix = '.tmp')
+  try:
+    with os.fdopen(descriptor,'wb') as file:
+      file.write(SNAPSHOT_MAGIC)
+      pickle.dump(object,file,pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_file_name,file_name)
+  except BaseException:
+    os.remove(temp_file_name)
+    raise
+
+  # Remove the snapshots of older deliveries and snapshot versions of the same company
+  remove_old_snapshots(file_name)
+
+# Return the company and delivery of a snapshot file name
+def _get_snapshot_delivery(file_name):
+  return os.path.basename(file_name).split('.')[0].split('-')[:5]
+
+# Remove the snapshots of the same company as a snapshot that are of another delivery or snapshot version
+def remove_old_snapshots(file_name):
+  delivery = _get_snapshot_delivery(file_name)
+  for other_file_name in glob.glob(os.path.join(os.path.dirname(file_name) or '.',"iff-{}-*.snapshot".format(delivery[1]))):
+    if _get_snapshot_delivery(other_file_name) != delivery or not other_file_name.endswith(".v{}.snapshot".format(SNAPSHOT_VERSION)):
+      try:
+        os.remove(other_file_name)
+      except FileNotFoundError:
+        pass
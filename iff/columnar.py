@@ -0,0 +1,189 @@
+from iff import IFF
+from iff.service import iter_services
+
+from array import array
+from datetime import timedelta
+
+import os
+import struct
+import sys
+import tempfile
+
+# Use pyarrow to write Parquet files if it is installed
+try:
+  import pyarrow
+  import pyarrow.parquet
+except ImportError:
+  pyarrow = None
+
+# Columns of the exported tables as names and types
+SERVICE_COLUMNS = [('service','int32'), ('id','int32'), ('company','int32'), ('variant','str'), ('name','str'), ('footnote','int32'), ('transport_mode','str')]
+STOP_COLUMNS = [('service','int32'), ('sequence','int16'), ('station','str'), ('arrival_time','int16'), ('arrival_platform','str'), ('departure_time','int16'), ('departure_platform','str')]
+FOOTNOTE_COLUMNS = [('footnote','int32'), ('date','int32')]
+STATION_COLUMNS = [('id','str'), ('name','str'), ('country','str'), ('train_changes','int16'), ('change_time','int16'), ('maximum_change_time','int16'), ('x_coord','int32'), ('y_coord','int32')]
+
+# Array type codes and NumPy descriptions of the numeric column types
+TYPECODES = {'int16': 'h', 'int32': 'i'}
+DESCRIPTIONS = {'int16': '<i2', 'int32': '<i4'}
+
+
+# Write the header of a NumPy .npy file, where the shape is a length or a tuple of lengths
+def write_npy_header(file, description, shape):
+  shape = shape if isinstance(shape,tuple) else (shape,)
+  header = "{{'descr': '{}', 'fortran_order': False, 'shape': ({}), }}".format(description,"{},".format(shape[0]) if len(shape) == 1 else ", ".join(str(length) for length in shape))
+  header += ' ' * (63 - (10 + len(header)) % 64) + "\n"
+  file.write(b'\x93NUMPY\x01\x00' + struct.pack('<H',len(header)) + header.encode('latin-1'))
+
+# Write an array of signed integers to a NumPy .npy file, with the length of the array as shape if no shape is given
+def write_npy(file_name, values, shape = None):
+  if sys.byteorder == 'big':
+    values = array(values.typecode,values)
+    values.byteswap()
+  with open(file_name,'wb') as file:
+    write_npy_header(file,"<i{}".format(values.itemsize),shape if shape is not None else len(values))
+    file.write(values.tobytes())
+
+
+# NumPy column writer class, which spools the values to a temporary file until the length is known
+class NpyColumnWriter:
+  # Constructor
+  def __init__(self, file_name, type):
+    self.file_name = file_name
+    self.type = type
+    self.length = 0
+    self.max_length = 1
+    self.spool = tempfile.TemporaryFile()
+
+  # Write values to the column
+  def write(self, values):
+    self.length += len(values)
+    if self.type == 'str':
+      for value in values:
+        encoded = value.encode('utf-8')
+        self.max_length = max(self.max_length,len(value))
+        self.spool.write(struct.pack('<I',len(encoded)) + encoded)
+    else:
+      data = array(TYPECODES[self.type],values)
+      if sys.byteorder == 'big':
+        data.byteswap()
+      self.spool.write(data.tobytes())
+
+  # Write the .npy file and remove the spool
+  def close(self):
+    self.spool.seek(0)
+    with open(self.file_name,'wb') as file:
+      if self.type == 'str':
+        # Write the strings as fixed width UTF-32 values
+        write_npy_header(file,"<U{}".format(self.max_length),self.length)
+        for index in range(self.length):
+          value = self.spool.read(struct.unpack('<I',self.spool.read(4))[0]).decode('utf-8')
+          file.write(value.ljust(self.max_length,'\0').encode('utf-32-le'))
+      else:
+        # Copy the numeric values
+        write_npy_header(file,DESCRIPTIONS[self.type],self.length)
+        while True:
+          data = self.spool.read(1048576)
+          if not data:
+            break
+          file.write(data)
+    self.spool.close()
+
+
+# Table writer class, which buffers rows and writes them in batches to a Parquet file or .npy files
+class TableWriter:
+  # Constructor
+  def __init__(self, directory, name, columns, format, batch_size):
+    self.columns = columns
+    self.format = format
+    self.batch_size = batch_size
+    self.buffers = [[] for column in columns]
+
+    if format == 'parquet':
+      self.schema = pyarrow.schema([(column, pyarrow.string() if type == 'str' else getattr(pyarrow,type)()) for column, type in columns])
+      self.writer = pyarrow.parquet.ParquetWriter(os.path.join(directory,"{}.parquet".format(name)),self.schema)
+    elif format == 'npy':
+      os.makedirs(os.path.join(directory,name),exist_ok = True)
+      self.writers = [NpyColumnWriter(os.path.join(directory,name,"{}.npy".format(column)),type) for column, type in columns]
+    else:
+      raise ValueError("Invalid format: {}".format(format))
+
+  # Write a row
+  def write(self, *row):
+    for buffer, value in zip(self.buffers,row):
+      buffer.append(value)
+    if len(self.buffers[0]) >= self.batch_size:
+      self.flush()
+
+  # Write the buffered rows
+  def flush(self):
+    if not self.buffers[0]:
+      return
+    if self.format == 'parquet':
+      self.writer.write_table(pyarrow.Table.from_arrays([pyarrow.array(buffer,type) for buffer, type in zip(self.buffers,self.schema.types)],schema = self.schema))
+    else:
+      for writer, buffer in zip(self.writers,self.buffers):
+        writer.write(buffer)
+    self.buffers = [[] for column in self.columns]
+
+  # Write the remaining rows and close the files
+  def close(self):
+    self.flush()
+    if self.format == 'parquet':
+      self.writer.close()
+    else:
+      for writer in self.writers:
+        writer.close()
+
+  # Enter a with statement
+  def __enter__(self):
+    return self
+
+  # Exit a with statement
+  def __exit__(self, type, value, traceback):
+    self.close()
+
+
+# Export a delivery to columnar files, streaming the services from the TIMETBLS file
+def export_columnar(directory, output_directory, format = None, batch_size = 65536):
+  format = format or ('parquet' if pyarrow is not None else 'npy')
+  if format == 'parquet' and pyarrow is None:
+    raise ImportError("Writing Parquet files requires pyarrow")
+
+  iff = IFF(directory)
+  os.makedirs(output_directory,exist_ok = True)
+
+  # Export the stations
+  with TableWriter(output_directory,'stations',STATION_COLUMNS,format,batch_size) as writer:
+    for station in iff.stations.values():
+      writer.write(station.id,station.name,station.country.id if station.country is not None else '',station.train_changes,station.change_time,station.maximum_change_time,station.x_coord,station.y_coord)
+
+  # Export the footnotes as the dates they are valid on
+  with TableWriter(output_directory,'footnotes',FOOTNOTE_COLUMNS,format,batch_size) as writer:
+    for footnote in iff.footnotes.values():
+      for day, valid in enumerate(footnote.vector):
+        if valid:
+          date = footnote.first_day + timedelta(days = day)
+          writer.write(footnote.id,date.year * 10000 + date.month * 100 + date.day)
+
+  # Export the services and their stops
+  with TableWriter(output_directory,'services',SERVICE_COLUMNS,format,batch_size) as service_writer, TableWriter(output_directory,'stops',STOP_COLUMNS,format,batch_size) as stop_writer:
+    for service_idx, service in enumerate(iter_services(os.path.join(directory,"timetbls.dat"),iff)):
+      service_writer.write(
+        service_idx,
+        service.id,
+        service.company.id if service.company is not None else -1,
+        service.variant,
+        service.name,
+        service.footnote.id if service.footnote is not None else -1,
+        service.transport_mode.id if service.transport_mode is not None else ''
+      )
+      for sequence, stop in enumerate(service.stops):
+        stop_writer.write(
+          service_idx,
+          sequence,
+          stop.station.id if stop.station is not None else '',
+          stop.arrival_time if stop.arrival_time is not None else -1,
+          stop.arrival_platform,
+          stop.departure_time if stop.departure_time is not None else -1,
+          stop.departure_platform
+        )
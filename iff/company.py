@@ -1,8 +1,8 @@
-from iff.parser import Record, File, Database
+from iff.parser import ReferenceRecord, File, Database
 from iff.delivery import IdentificationRecord
 
 # COmpany record class
-class CompanyRecord(Record):
+class CompanyRecord(ReferenceRecord):
   # Read a record from a string
   @classmethod
   def read(cls, string, context):
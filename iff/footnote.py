@@ -1,13 +1,14 @@
-from iff.parser import Record, File, Database
+from iff.parser import Record, ReferenceRecord, File, Database
 from iff.delivery import IdentificationRecord
 
 # Footnote record class
-class FootnoteRecord(Record):
+class FootnoteRecord(ReferenceRecord):
   # Read a record from a string
   @classmethod
   def read(cls, string, context):
     return cls(
       id = int(string[1:6]),
+      bits = 0,
       first_day = context.delivery.identification_record.first_day,
       last_day = context.delivery.identification_record.last_day,
     )
@@ -20,7 +21,12 @@ class FootnoteRecord(Record):
 
     # Calculate the difference
     diff = (date - self.first_day).days
-    return self.vector[diff]
+    return bool(self.bits >> diff & 1)
+
+  # Return the validity vector as a list of booleans
+  @property
+  def vector(self):
+    return [bool(self.bits >> diff & 1) for diff in range((self.last_day - self.first_day).days + 1)]
 
   # Convert to string
   def __str__(self):
@@ -28,11 +34,11 @@ class FootnoteRecord(Record):
 
 # Vector record class
 class VectorRecord(Record):
-  # Read a record from a string
+  # Read a record from a string, where the first day is the lowest bit
   @classmethod
   def read(cls, string, context):
     return cls(
-      vector = [character == '1' for character in string]
+      bits = int(string.strip()[::-1] or '0',2)
     )
 
 
@@ -47,6 +53,35 @@ class FootnoteFile(File, Database):
   # Constructor
   def __init__(self, identification_record):
     File.__init__(self,identification_record)
+    self.vectors = {}
+    self._valid_ids = {}
+
+  # Return the state to pickle this file, without cached lookups
+  def __getstate__(self):
+    return dict(self.__dict__,_valid_ids = {})
+
+  # Add a footnote and share its bit vector with identical footnotes
+  def add(self, record):
+    record.bits = self.vectors.setdefault(record.bits,record.bits)
+    Database.add(self,record)
+    self._valid_ids.clear()
+
+  # Return the ids of all footnotes that are valid on a date
+  def valid_on(self, date):
+    if date not in self._valid_ids:
+      # Check if the date is in range
+      first_day = self.identification_record.first_day
+      last_day = self.identification_record.last_day
+      if date < first_day or date > last_day:
+        valid_ids = frozenset()
+      else:
+        # Check every distinct vector only once
+        diff = (date - first_day).days
+        valid_bits = set(bits for bits in self.vectors if bits >> diff & 1)
+        valid_ids = frozenset(id for id, footnote in self.items() if footnote.bits in valid_bits)
+
+      self._valid_ids[date] = valid_ids
+    return self._valid_ids[date]
 
   # Read a footnote file
   @classmethod
@@ -84,7 +119,7 @@ class FootnoteFile(File, Database):
             raise RuntimeError("No footnote is selected")
 
           # Set the vector
-          current_footnote.vector = record.vector
+          current_footnote.bits = record.bits
 
       # Append the last footnote
       if current_footnote is not None:
@@ -0,0 +1,231 @@
+from iff.parser import Time
+from iff.journey import INFINITY, JourneyLeg
+
+from array import array
+from bisect import bisect_left
+from heapq import heappush, heappop
+
+# Node kind constants
+ARRIVAL_NODE = 0
+DEPARTURE_NODE = 1
+TRANSFER_NODE = 2
+
+
+# Graph arrival result class
+class GraphArrival:
+  # Constructor
+  def __init__(self, graph, arrival_times, arrival_nodes, previous):
+    self.graph = graph
+    self.arrival_times = arrival_times
+    self.arrival_nodes = arrival_nodes
+    self.previous = previous
+
+  # Return the earliest arrival time at a station
+  def get_arrival_time(self, station):
+    arrival_time = self.arrival_times[self.graph.station_indices[station.id]]
+    return Time(0,arrival_time) if arrival_time != INFINITY else None
+
+  # Return the legs of the journey to a station
+  def get_journey(self, station):
+    graph = self.graph
+    station_idx = graph.station_indices[station.id]
+    if self.arrival_times[station_idx] == INFINITY:
+      return None
+
+    # Walk back over the nodes until the origin is reached
+    path = []
+    node = self.arrival_nodes[station_idx]
+    while node != -1:
+      path.append(node)
+      node = self.previous[node]
+    path.reverse()
+
+    # Split the path into legs at the transfer nodes
+    journey = []
+    boarding = None
+    for position, node in enumerate(path):
+      kind = graph.node_kinds[node]
+      if kind == DEPARTURE_NODE and boarding is None:
+        boarding = node
+      elif kind == ARRIVAL_NODE and (position + 1 == len(path) or graph.node_kinds[path[position + 1]] != DEPARTURE_NODE):
+        service = graph.services[graph.node_services[node]]
+        journey.append(JourneyLeg(service,service.stops[graph.node_stops[boarding]],service.stops[graph.node_stops[node]]))
+        boarding = None
+    return journey
+
+
+# Time expanded graph class, which stores the ride, stay, transfer and wait edges of a date in compressed sparse row arrays
+class TimeExpandedGraph:
+  # Constructor
+  def __init__(self, services, stations, date, conservative = False):
+    self.date = date
+    self.services = services.for_date(date).services
+    self.stations = list(stations.values())
+    self.station_indices = {station.id: station_idx for station_idx, station in enumerate(self.stations)}
+
+    # Use the maximum change times if the transfers should be conservative
+    if conservative:
+      change_times = [station.maximum_change_time for station in self.stations]
+    else:
+      change_times = [station.change_time for station in self.stations]
+
+    # Initialize the nodes and edges
+    self.node_times = array('i')
+    self.node_stations = array('i')
+    self.node_services = array('i')
+    self.node_stops = array('i')
+    self.node_kinds = bytearray()
+    sources = array('i')
+    targets = array('i')
+    weights = array('i')
+
+    def add_node(time, station_idx, service_idx, stop_idx, kind):
+      self.node_times.append(time)
+      self.node_stations.append(station_idx)
+      self.node_services.append(service_idx)
+      self.node_stops.append(stop_idx)
+      self.node_kinds.append(kind)
+      return len(self.node_kinds) - 1
+
+    def add_edge(source, target, weight):
+      sources.append(source)
+      targets.append(target)
+      weights.append(weight)
+
+    # Add the arrival and departure nodes of every service with its ride and stay edges
+    departures = [[] for station in self.stations]
+    arrival_nodes = []
+    for service_idx, service in enumerate(self.services):
+      previous = None
+      for stop_idx, stop in enumerate(service.stops):
+        if stop.is_passing():
+          continue
+
+        station_idx = self.station_indices.get(stop.station.id) if stop.station is not None else None
+        if station_idx is None:
+          previous = None
+          continue
+
+        # Ride from the previous departure to this arrival
+        arrival_node = None
+        if previous is not None and stop.is_arriving():
+          arrival_time = int(stop.arrival_time)
+          arrival_node = add_node(arrival_time,station_idx,service_idx,stop_idx,ARRIVAL_NODE)
+          add_edge(previous,arrival_node,arrival_time - self.node_times[previous])
+          arrival_nodes.append(arrival_node)
+
+        # Stay in the service until its departure
+        if stop.is_departing():
+          departure_time = int(stop.departure_time)
+          departure_node = add_node(departure_time,station_idx,service_idx,stop_idx,DEPARTURE_NODE)
+          if arrival_node is not None:
+            add_edge(arrival_node,departure_node,departure_time - arrival_time)
+          departures[station_idx].append((departure_time,departure_node))
+          previous = departure_node
+        else:
+          previous = None
+
+    # Add a transfer node for every departure, with wait edges between the transfer nodes of a station
+    self.transfer_times = []
+    self.transfer_nodes = []
+    for station_idx, station_departures in enumerate(departures):
+      station_departures.sort()
+      times = array('i')
+      nodes = array('i')
+      for departure_time, departure_node in station_departures:
+        transfer_node = add_node(departure_time,station_idx,-1,-1,TRANSFER_NODE)
+        add_edge(transfer_node,departure_node,0)
+        if nodes:
+          add_edge(nodes[-1],transfer_node,departure_time - times[-1])
+        times.append(departure_time)
+        nodes.append(transfer_node)
+      self.transfer_times.append(times)
+      self.transfer_nodes.append(nodes)
+
+    # Add a transfer edge from every arrival to the first departure after the change time
+    for arrival_node in arrival_nodes:
+      station_idx = self.node_stations[arrival_node]
+      times = self.transfer_times[station_idx]
+      position = bisect_left(times,self.node_times[arrival_node] + change_times[station_idx])
+      if position < len(times):
+        add_edge(arrival_node,self.transfer_nodes[station_idx][position],times[position] - self.node_times[arrival_node])
+
+    # Store the edges by source node in compressed sparse row arrays
+    node_count = len(self.node_kinds)
+    self.offsets = array('i',[0]) * (node_count + 1)
+    for source in sources:
+      self.offsets[source + 1] += 1
+    for node in range(node_count):
+      self.offsets[node + 1] += self.offsets[node]
+
+    positions = array('i',self.offsets[:-1])
+    self.targets = array('i',[0]) * len(sources)
+    self.weights = array('i',[0]) * len(sources)
+    for source, target, weight in zip(sources,targets,weights):
+      self.targets[positions[source]] = target
+      self.weights[positions[source]] = weight
+      positions[source] += 1
+
+  # Return the number of nodes
+  @property
+  def node_count(self):
+    return len(self.node_kinds)
+
+  # Return the number of edges
+  @property
+  def edge_count(self):
+    return len(self.targets)
+
+  # Return the earliest arrival at every station when departing from an origin at a time, using Dijkstra's algorithm
+  def earliest_arrival(self, origin, departure_time, destination = None):
+    node_times = self.node_times
+    node_stations = self.node_stations
+    node_kinds = self.node_kinds
+    offsets = self.offsets
+    targets = self.targets
+    weights = self.weights
+
+    # Initialize the labels
+    departure_time = int(departure_time)
+    distances = array('i',[INFINITY]) * self.node_count
+    previous = array('i',[-1]) * self.node_count
+    arrival_times = [INFINITY] * len(self.stations)
+    arrival_nodes = [-1] * len(self.stations)
+
+    origin_idx = self.station_indices[origin.id]
+    arrival_times[origin_idx] = departure_time
+    destination_idx = self.station_indices[destination.id] if destination is not None else None
+
+    # Start at the first transfer node at the origin after the departure time
+    queue = []
+    position = bisect_left(self.transfer_times[origin_idx],departure_time)
+    if position < len(self.transfer_times[origin_idx]):
+      start = self.transfer_nodes[origin_idx][position]
+      distances[start] = node_times[start]
+      queue.append((node_times[start],start))
+
+    # Settle the nodes in increasing time
+    while queue:
+      time, node = heappop(queue)
+      if time > distances[node]:
+        continue
+
+      # Store the arrival at the station of an arrival node
+      if node_kinds[node] == ARRIVAL_NODE:
+        station_idx = node_stations[node]
+        if time < arrival_times[station_idx]:
+          arrival_times[station_idx] = time
+          arrival_nodes[station_idx] = node
+        if station_idx == destination_idx:
+          break
+
+      # Relax the outgoing edges
+      for edge in range(offsets[node],offsets[node + 1]):
+        target = targets[edge]
+        target_time = time + weights[edge]
+        if target_time < distances[target]:
+          distances[target] = target_time
+          previous[target] = node
+          heappush(queue,(target_time,target))
+
+    return GraphArrival(self,arrival_times,arrival_nodes,previous)
@@ -0,0 +1,150 @@
+from iff import IFF
+from iff.service import iter_services
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import csv
+import os
+
+# GTFS route type for rail services
+ROUTE_TYPE_RAIL = 2
+
+# GTFS pickup and drop off types
+REGULARLY_SCHEDULED = 0
+NOT_AVAILABLE = 1
+
+# GTFS exception type for added dates
+SERVICE_ADDED = 1
+
+
+# Convert Rijksdriehoek coordinates in meters to WGS84 latitude and longitude, using the approximation of Schreutelkamp and Strang van Hees
+def rd_to_wgs84(x, y):
+  dx = (x - 155000) * 1e-5
+  dy = (y - 463000) * 1e-5
+
+  latitude = (3235.65389 * dy - 32.58297 * dx ** 2 - 0.2475 * dy ** 2 - 0.84978 * dx ** 2 * dy - 0.0655 * dy ** 3 - 0.01709 * dx ** 2 * dy ** 2
+    - 0.00738 * dx + 0.0053 * dx ** 4 - 0.00039 * dx ** 2 * dy ** 3 + 0.00033 * dx ** 4 * dy - 0.00012 * dx * dy)
+  longitude = (5260.52916 * dx + 105.94684 * dx * dy + 2.45656 * dx * dy ** 2 - 0.81885 * dx ** 3 + 0.05594 * dx * dy ** 3 - 0.05607 * dx ** 3 * dy
+    + 0.01199 * dy - 0.00256 * dx ** 3 * dy ** 2 + 0.00128 * dx * dy ** 4 + 0.00022 * dy ** 2 - 0.00022 * dx ** 2 + 0.00026 * dx ** 5)
+  return 52.15517440 + latitude / 3600, 5.38720621 + longitude / 3600
+
+# Convert a time to a GTFS time, which counts hours past midnight
+def format_time(time):
+  return "{:02d}:{:02d}:00".format(int(time) // 60,int(time) % 60)
+
+# Return the GTFS service id of every footnote, so footnotes with identical bit vectors share a service id
+def footnote_service_ids(footnotes):
+  service_ids = {}
+  bits_ids = {}
+  for id, footnote in footnotes.items():
+    service_ids[id] = bits_ids.setdefault(footnote.bits,id)
+  return service_ids
+
+# Open a GTFS file and return a CSV writer that has written the header
+def _open_file(output_directory, name, header):
+  file = open(os.path.join(output_directory,name),'w',newline = '',encoding = 'utf-8')
+  writer = csv.writer(file)
+  writer.writerow(header)
+  return file, writer
+
+
+# Write the agency.txt file from the companies
+def write_agencies(directory, output_directory, agency_url, agency_timezone):
+  iff = IFF(directory)
+  file, writer = _open_file(output_directory,"agency.txt",['agency_id','agency_name','agency_url','agency_timezone'])
+  with file:
+    for company in iff.companies.values():
+      writer.writerow([company.id,company.name or company.code,agency_url,agency_timezone])
+
+# Write the stops.txt file from the stations
+def write_stops(directory, output_directory):
+  iff = IFF(directory)
+  file, writer = _open_file(output_directory,"stops.txt",['stop_id','stop_code','stop_name','stop_lat','stop_lon'])
+  with file:
+    for station in iff.stations.values():
+      latitude, longitude = rd_to_wgs84(*station.get_coordinates())
+      writer.writerow([station.id,station.id,station.name,"{:.6f}".format(latitude),"{:.6f}".format(longitude)])
+
+# Write the calendar_dates.txt file from the distinct footnotes
+def write_calendar_dates(directory, output_directory):
+  iff = IFF(directory)
+  service_ids = footnote_service_ids(iff.footnotes)
+  file, writer = _open_file(output_directory,"calendar_dates.txt",['service_id','date','exception_type'])
+  with file:
+    for id, footnote in iff.footnotes.items():
+      # Skip the footnotes that share the service id of an earlier footnote
+      if service_ids[id] != id:
+        continue
+      for day, valid in enumerate(footnote.vector):
+        if valid:
+          writer.writerow([id,"{:%Y%m%d}".format(footnote.first_day + timedelta(days = day)),SERVICE_ADDED])
+
+# Write the routes.txt, trips.txt and stop_times.txt files in a single pass over the TIMETBLS file
+def write_trips(directory, output_directory):
+  iff = IFF(directory)
+  service_ids = footnote_service_ids(iff.footnotes)
+  routes = {}
+
+  trips_file, trips_writer = _open_file(output_directory,"trips.txt",['route_id','service_id','trip_id','trip_short_name','trip_headsign'])
+  stop_times_file, stop_times_writer = _open_file(output_directory,"stop_times.txt",['trip_id','arrival_time','departure_time','stop_id','stop_sequence','pickup_type','drop_off_type'])
+  with trips_file, stop_times_file:
+    for service_idx, service in enumerate(iter_services(os.path.join(directory,"timetbls.dat"),iff)):
+      # Skip services that are never valid
+      if service.footnote is None:
+        continue
+
+      # Create a route for every company and transport mode
+      company_id = service.company.id if service.company is not None else ''
+      transport_mode_id = service.transport_mode.id if service.transport_mode is not None else ''
+      route_id = "{}:{}".format(company_id,transport_mode_id)
+      if route_id not in routes:
+        routes[route_id] = [route_id,company_id,transport_mode_id,str(service.transport_mode) if service.transport_mode is not None else '',ROUTE_TYPE_RAIL]
+
+      # Write the trip, headed to the last stop at a known station
+      trip_id = "{}:{}".format(service.id,service_idx)
+      headsign = next((stop.station.name for stop in reversed(service.stops) if stop.station is not None),'')
+      trips_writer.writerow([route_id,service_ids[service.footnote.id],trip_id,service.id,headsign])
+
+      # Write the stops at known stations where the service does not pass
+      for sequence, stop in enumerate(service.stops):
+        if stop.is_passing() or stop.station is None:
+          continue
+        arrival_time = stop.arrival_time if stop.arrival_time is not None else stop.departure_time
+        departure_time = stop.departure_time if stop.departure_time is not None else stop.arrival_time
+        stop_times_writer.writerow([
+          trip_id,
+          format_time(arrival_time),
+          format_time(departure_time),
+          stop.station.id,
+          sequence,
+          REGULARLY_SCHEDULED if stop.is_departing() else NOT_AVAILABLE,
+          REGULARLY_SCHEDULED if stop.is_arriving() else NOT_AVAILABLE
+        ])
+
+  # Write the routes that were found
+  file, writer = _open_file(output_directory,"routes.txt",['route_id','agency_id','route_short_name','route_long_name','route_type'])
+  with file:
+    writer.writerows(routes.values())
+
+
+# Export a delivery to a GTFS feed, writing the output files in parallel if processes is set
+def export_gtfs(directory, output_directory, agency_url = "https://www.ns.nl", agency_timezone = "Europe/Amsterdam", processes = None):
+  os.makedirs(output_directory,exist_ok = True)
+  tasks = [
+    (write_agencies,(directory,output_directory,agency_url,agency_timezone)),
+    (write_stops,(directory,output_directory)),
+    (write_calendar_dates,(directory,output_directory)),
+    (write_trips,(directory,output_directory))
+  ]
+
+  # Write the files in this process
+  if processes is None:
+    for function, args in tasks:
+      function(*args)
+
+  # Write the files in a pool of processes, every process reading the files it needs
+  else:
+    with ProcessPoolExecutor(processes) as executor:
+      for future in [executor.submit(function,*args) for function, args in tasks]:
+        future.result()
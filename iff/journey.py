@@ -0,0 +1,277 @@
+from iff.parser import Time
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+# Constant for unreachable stations
+INFINITY = 2 ** 31 - 1
+
+
+# Journey leg tuple
+JourneyLeg = namedtuple('JourneyLeg',['service','departure','arrival'])
+
+# Walking leg tuple, with the duration in minutes
+WalkingLeg = namedtuple('WalkingLeg',['departure_station','arrival_station','duration'])
+
+
+# Return the minimum travel time from an origin to every station over the departures within a time window, scanning connections of valid services sorted by arrival time once
+def scan_travel_times(connections, change_times, origin_idx, from_time, to_time):
+  departure_times, arrival_times, departure_stations, arrival_stations, service_indices = connections
+
+  # Initialize the profiles, which store the arrival times at every station with the latest departure from the origin to make them
+  profile_arrivals = [[] for change_time in change_times]
+  profile_departures = [[] for change_time in change_times]
+  service_departures = {}
+  travel_times = [INFINITY] * len(change_times)
+  travel_times[origin_idx] = 0
+
+  # Scan the connections arriving after the start of the window in increasing arrival time
+  for connection in range(bisect_left(arrival_times,from_time),len(arrival_times)):
+    # Calculate the latest departure from the origin when boarding here or staying seated
+    station_idx = departure_stations[connection]
+    if station_idx == origin_idx:
+      departure = departure_times[connection] if departure_times[connection] >= from_time else -1
+    else:
+      position = bisect_right(profile_arrivals[station_idx],departure_times[connection] - change_times[station_idx]) - 1
+      departure = profile_departures[station_idx][position] if position >= 0 else -1
+    departure = max(departure,service_departures.get(service_indices[connection],-1))
+    if departure < 0:
+      continue
+    service_departures[service_indices[connection]] = departure
+
+    # Add the pair to the profile of the arrival station if it is not dominated
+    station_idx = arrival_stations[connection]
+    arrivals = profile_arrivals[station_idx]
+    departures = profile_departures[station_idx]
+    if station_idx == origin_idx or (departures and departure <= departures[-1]):
+      continue
+    if arrivals and arrivals[-1] == arrival_times[connection]:
+      departures[-1] = departure
+    else:
+      arrivals.append(arrival_times[connection])
+      departures.append(departure)
+
+    # Calculate the travel time, counting the wait at the origin for departures after the window
+    travel_time = arrival_times[connection] - min(departure,to_time)
+    if travel_time < travel_times[station_idx]:
+      travel_times[station_idx] = travel_time
+  return travel_times
+
+
+# Earliest arrival result class
+class EarliestArrival:
+  # Constructor
+  def __init__(self, scan, arrival_times, legs):
+    self.scan = scan
+    self.arrival_times = arrival_times
+    self.legs = legs
+
+  # Return the earliest arrival time at a station
+  def get_arrival_time(self, station):
+    arrival_time = self.arrival_times[self.scan.station_indices[station.id]]
+    return Time(0,arrival_time) if arrival_time != INFINITY else None
+
+  # Return the legs of the journey to a station
+  def get_journey(self, station):
+    scan = self.scan
+    station_idx = scan.station_indices[station.id]
+    if self.arrival_times[station_idx] == INFINITY:
+      return None
+
+    # Walk back over the legs until the origin is reached
+    journey = []
+    while self.legs[station_idx] is not None:
+      # Walk back over a walking leg
+      if isinstance(self.legs[station_idx],WalkingLeg):
+        journey.append(self.legs[station_idx])
+        station_idx = scan.station_indices[self.legs[station_idx].departure_station.id]
+        continue
+
+      boarding, alighting = self.legs[station_idx]
+      service = scan.services[scan.service_indices[boarding]]
+      journey.append(JourneyLeg(service,service.stops[scan.departure_stops[boarding]],service.stops[scan.arrival_stops[alighting]]))
+      station_idx = scan.departure_stations[boarding]
+    journey.reverse()
+    return journey
+
+
+# Connection scan class, which optionally walks between stations along footpaths given as a dict of station ids and lists of stations and minutes
+class ConnectionScan:
+  # Constructor
+  def __init__(self, services, stations, footpaths = None):
+    self.services = services
+    self.stations = list(stations.values())
+    self.station_indices = {station.id: station_idx for station_idx, station in enumerate(self.stations)}
+    self.change_times = array('i',(station.change_time for station in self.stations))
+    self._valid_services = {}
+    self._arrival_connections = {}
+
+    # Store the footpaths per station index
+    self.footpaths = [[] for station in self.stations]
+    for station_id, station_footpaths in (footpaths or {}).items():
+      if station_id in self.station_indices:
+        self.footpaths[self.station_indices[station_id]] = [(self.station_indices[other.id],duration) for other, duration in station_footpaths if other.id in self.station_indices]
+
+    # Collect the elementary connections between consecutive stops of every service
+    connections = []
+    for service_idx, service in enumerate(services):
+      previous = None
+      for stop_idx, stop in enumerate(service.stops):
+        if stop.is_passing():
+          continue
+
+        station_idx = self.station_indices.get(stop.station.id) if stop.station is not None else None
+        if previous is not None and station_idx is not None and stop.is_arriving():
+          connections.append((previous[0],int(stop.arrival_time),previous[1],station_idx,service_idx,previous[2],stop_idx))
+
+        previous = (int(stop.departure_time),station_idx,stop_idx) if station_idx is not None and stop.is_departing() else None
+
+    # Store the connections sorted by departure time in flat arrays
+    connections.sort()
+    self.departure_times = array('i',(connection[0] for connection in connections))
+    self.arrival_times = array('i',(connection[1] for connection in connections))
+    self.departure_stations = array('i',(connection[2] for connection in connections))
+    self.arrival_stations = array('i',(connection[3] for connection in connections))
+    self.service_indices = array('i',(connection[4] for connection in connections))
+    self.departure_stops = array('i',(connection[5] for connection in connections))
+    self.arrival_stops = array('i',(connection[6] for connection in connections))
+
+  # Return a bytearray that flags the services that are valid on a date
+  def get_valid_services(self, date):
+    if date not in self._valid_services:
+      valid_on = self.services._valid_on(date)
+      self._valid_services[date] = bytearray(valid_on(service) for service in self.services)
+    return self._valid_services[date]
+
+  # Return the departure times, arrival times, departure stations, arrival stations and service indices of the connections of the services that are valid on a date, sorted by arrival time
+  def get_arrival_connections(self, date):
+    if date not in self._arrival_connections:
+      valid_services = self.get_valid_services(date)
+      connections = [connection for connection in range(len(self.departure_times)) if valid_services[self.service_indices[connection]]]
+      connections.sort(key = lambda connection: (self.arrival_times[connection],self.departure_times[connection]))
+      self._arrival_connections[date] = tuple(array('i',(values[connection] for connection in connections))
+        for values in (self.departure_times,self.arrival_times,self.departure_stations,self.arrival_stations,self.service_indices))
+    return self._arrival_connections[date]
+
+  # Return the minimum travel time in minutes from an origin to every station over the departures within a time window, where waiting at the origin counts as travel time
+  def travel_times(self, date, origin, from_time, to_time = None):
+    travel_times = scan_travel_times(self.get_arrival_connections(date),self.change_times,self.station_indices[origin.id],int(from_time),int(to_time if to_time is not None else from_time))
+    return {station.id: travel_time for station, travel_time in zip(self.stations,travel_times) if travel_time != INFINITY}
+
+  # Return the earliest arrival at every station when departing from an origin at a time
+  def earliest_arrival(self, date, origin, departure_time, destination = None):
+    valid_services = self.get_valid_services(date)
+    departure_times = self.departure_times
+    arrival_times = self.arrival_times
+    departure_stations = self.departure_stations
+    arrival_stations = self.arrival_stations
+    service_indices = self.service_indices
+    change_times = self.change_times
+    footpaths = self.footpaths
+
+    # Initialize the labels
+    departure_time = int(departure_time)
+    arrival = [INFINITY] * len(self.stations)
+    ready = [INFINITY] * len(self.stations)
+    legs = [None] * len(self.stations)
+    boarded = {}
+
+    origin_idx = self.station_indices[origin.id]
+    arrival[origin_idx] = departure_time
+    ready[origin_idx] = departure_time
+    destination_idx = self.station_indices[destination.id] if destination is not None else None
+
+    # Walk from the origin
+    for station_idx, duration in footpaths[origin_idx]:
+      if departure_time + duration < arrival[station_idx]:
+        arrival[station_idx] = ready[station_idx] = departure_time + duration
+        legs[station_idx] = WalkingLeg(origin,self.stations[station_idx],duration)
+
+    # Scan the connections departing after the departure time
+    for connection in range(bisect_left(departure_times,departure_time),len(departure_times)):
+      # Stop if no connection can improve the arrival at the destination
+      if destination_idx is not None and departure_times[connection] >= arrival[destination_idx]:
+        break
+
+      service_idx = service_indices[connection]
+      if not valid_services[service_idx]:
+        continue
+
+      # Check if the service is already boarded or can be boarded
+      boarding = boarded.get(service_idx)
+      if boarding is None:
+        if ready[departure_stations[connection]] > departure_times[connection]:
+          continue
+        boarding = boarded[service_idx] = connection
+
+      # Relax the arrival station
+      station_idx = arrival_stations[connection]
+      if arrival_times[connection] < arrival[station_idx]:
+        arrival[station_idx] = arrival_times[connection]
+        ready[station_idx] = arrival_times[connection] + change_times[station_idx]
+        legs[station_idx] = (boarding,connection)
+
+        # Walk from the arrival station to the stations nearby
+        for other_idx, duration in footpaths[station_idx]:
+          if arrival_times[connection] + duration < arrival[other_idx]:
+            arrival[other_idx] = ready[other_idx] = arrival_times[connection] + duration
+            legs[other_idx] = WalkingLeg(self.stations[station_idx],self.stations[other_idx],duration)
+
+    return EarliestArrival(self,arrival,legs)
+
+  # Return the Pareto set of departure and arrival times from every station to a destination
+  def profile(self, date, destination, from_time = None):
+    valid_services = self.get_valid_services(date)
+    departure_times = self.departure_times
+    arrival_times = self.arrival_times
+    departure_stations = self.departure_stations
+    arrival_stations = self.arrival_stations
+    service_indices = self.service_indices
+    change_times = self.change_times
+
+    # Initialize the profiles, which store negated departure times to bisect on
+    destination_idx = self.station_indices[destination.id]
+    service_arrivals = [INFINITY] * len(self.services)
+    profile_departures = [[] for station in self.stations]
+    profile_arrivals = [[] for station in self.stations]
+    first = bisect_left(departure_times,int(from_time)) if from_time is not None else 0
+
+    # Scan the connections in decreasing departure time
+    for connection in range(len(departure_times) - 1,first - 1,-1):
+      service_idx = service_indices[connection]
+      if not valid_services[service_idx]:
+        continue
+
+      # Calculate the arrival when leaving the service, staying seated or transferring
+      station_idx = arrival_stations[connection]
+      if station_idx == destination_idx:
+        best = arrival_times[connection]
+      else:
+        best = service_arrivals[service_idx]
+        departures = profile_departures[station_idx]
+        position = bisect_right(departures,-(arrival_times[connection] + change_times[station_idx])) - 1
+        if position >= 0 and profile_arrivals[station_idx][position] < best:
+          best = profile_arrivals[station_idx][position]
+
+      if best == INFINITY:
+        continue
+      if best < service_arrivals[service_idx]:
+        service_arrivals[service_idx] = best
+
+      # Add the pair to the profile of the departure station if it is not dominated, but not to the profile of the destination itself
+      station_idx = departure_stations[connection]
+      if station_idx == destination_idx:
+        continue
+      departures = profile_departures[station_idx]
+      arrivals = profile_arrivals[station_idx]
+      if not arrivals or best < arrivals[-1]:
+        if departures and departures[-1] == -departure_times[connection]:
+          arrivals[-1] = best
+        else:
+          departures.append(-departure_times[connection])
+          arrivals.append(best)
+
+    # Convert the profiles to lists of times in increasing departure time
+    return {station.id: [(Time(0,-departure),Time(0,arrival)) for departure, arrival in zip(reversed(profile_departures[station_idx]),reversed(profile_arrivals[station_idx]))]
+      for station_idx, station in enumerate(self.stations) if profile_departures[station_idx]}
@@ -0,0 +1,91 @@
+from iff.journey import INFINITY, scan_travel_times
+from iff.columnar import write_npy
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import os
+
+# Value of unreachable stations in the written matrix
+UNREACHABLE = -1
+
+# Number of origins per task
+ORIGINS_PER_TASK = 16
+
+# Connection arrays of a worker process, attached to the shared memory
+_arrays = None
+_blocks = None
+
+
+# Return the rows of the matrix for a list of origins, with a single scan of the connections per origin
+def compute_rows(connections, change_times, origin_indices, from_time, to_time):
+  rows = array('i')
+  for origin_idx in origin_indices:
+    rows.extend(travel_time if travel_time != INFINITY else UNREACHABLE for travel_time in scan_travel_times(connections,change_times,origin_idx,from_time,to_time))
+  return rows
+
+
+# Attach the shared connection arrays in a worker process
+def _attach(names, lengths):
+  global _arrays, _blocks
+  _blocks = [shared_memory.SharedMemory(name = name) for name in names]
+  _arrays = [block.buf.cast('i')[:length] for block, length in zip(_blocks,lengths)]
+
+# Compute the rows of the matrix for a list of origins in a worker process
+def _compute_rows(origin_indices, from_time, to_time):
+  return compute_rows(_arrays[:-1],_arrays[-1],origin_indices,from_time,to_time)
+
+
+# Travel time matrix class
+class TravelTimeMatrix:
+  # Constructor
+  def __init__(self, stations, origins, times):
+    self.stations = stations
+    self.origins = origins
+    self.times = times
+    self.station_indices = {station.id: station_idx for station_idx, station in enumerate(stations)}
+    self.origin_indices = {station.id: origin_idx for origin_idx, station in enumerate(origins)}
+
+  # Return the travel time in minutes between two stations, or None if the destination is unreachable
+  def get_travel_time(self, origin, destination):
+    travel_time = self.times[self.origin_indices[origin.id] * len(self.stations) + self.station_indices[destination.id]]
+    return travel_time if travel_time != UNREACHABLE else None
+
+  # Write the matrix to a NumPy .npy file with a row per origin and a column per station
+  def save(self, file_name):
+    write_npy(file_name,self.times,(len(self.origins),len(self.stations)))
+
+
+# Compute the minimum travel times from origins to all stations over the departures within a window, using a pool of processes if requested
+def travel_time_matrix(scan, date, from_time, to_time = None, origins = None, processes = None):
+  # Use the connections of the services that are valid on the date, sorted by arrival time
+  arrays = list(scan.get_arrival_connections(date)) + [scan.change_times]
+
+  # Determine the origins and the window
+  origins = list(origins) if origins is not None else scan.stations
+  origin_indices = [scan.station_indices[origin.id] for origin in origins]
+  from_time = int(from_time)
+  to_time = int(to_time) if to_time is not None else from_time
+
+  # Compute the rows in this process
+  if processes is None:
+    return TravelTimeMatrix(scan.stations,origins,compute_rows(arrays[:-1],arrays[-1],origin_indices,from_time,to_time))
+
+  # Copy the arrays to shared memory, so the processes read them without copying
+  blocks = [shared_memory.SharedMemory(create = True,size = max(len(values),1) * values.itemsize) for values in arrays]
+  try:
+    for block, values in zip(blocks,arrays):
+      block.buf[:len(values) * values.itemsize] = values.tobytes()
+
+    # Compute the rows of chunks of origins in the processes
+    times = array('i')
+    chunks = [origin_indices[start:start + ORIGINS_PER_TASK] for start in range(0,len(origin_indices),ORIGINS_PER_TASK)]
+    with ProcessPoolExecutor(processes or os.cpu_count() or 1,initializer = _attach,initargs = ([block.name for block in blocks],[len(values) for values in arrays])) as executor:
+      for rows in executor.map(_compute_rows,chunks,[from_time] * len(chunks),[to_time] * len(chunks)):
+        times.extend(rows)
+    return TravelTimeMatrix(scan.stations,origins,times)
+  finally:
+    for block in blocks:
+      block.close()
+      block.unlink()
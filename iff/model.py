@@ -1,19 +1,42 @@
-from collections import namedtuple
-from copy import copy
+from iff.parser import Date, Time
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple, OrderedDict
+from collections.abc import Sequence
+from datetime import datetime, timedelta
 from functools import total_ordering
+from operator import itemgetter
 from sortedcontainers import SortedListWithKey
 
+import threading
+
 
 # Stop class
 @total_ordering
 class Stop:
+  # Attributes of a stop
+  __slots__ = ('station','arrival_time','arrival_platform','departure_time','departure_platform')
+
   # Constructor
   def __init__(self, station, **kwargs):
+    time = kwargs.get('time')
     self.station = station
-    self.arrival_time = kwargs.get('time') or kwargs.get('arrival_time')
-    self.arrival_platform = (kwargs.get('arrival_platform') or '') if self.arrival_time else ''
-    self.departure_time = kwargs.get('time') or kwargs.get('departure_time')
-    self.departure_platform = (kwargs.get('departure_platform') or '') if self.departure_time else ''
+    self.arrival_time = time if time is not None else kwargs.get('arrival_time')
+    self.arrival_platform = (kwargs.get('arrival_platform') or '') if self.arrival_time is not None else ''
+    self.departure_time = time if time is not None else kwargs.get('departure_time')
+    self.departure_platform = (kwargs.get('departure_platform') or '') if self.departure_time is not None else ''
+
+  # Create a stop from its attributes without checking them
+  @classmethod
+  def create(cls, station, arrival_time, arrival_platform, departure_time, departure_platform):
+    stop = cls.__new__(cls)
+    stop.station = station
+    stop.arrival_time = arrival_time
+    stop.arrival_platform = arrival_platform
+    stop.departure_time = departure_time
+    stop.departure_platform = departure_platform
+    return stop
 
   # Return if this stop has a departure
   def is_departing(self):
@@ -27,6 +50,10 @@ class Stop:
   def is_passing(self):
     return not self.is_departing() and not self.is_arriving()
 
+  # Return the time of this stop, which is the departure time if present
+  def get_time(self):
+    return self.departure_time if self.departure_time is not None else self.arrival_time
+
   # Return if this stop is equal to another stop
   def __eq__(self, other):
     if not isinstance(other,Stop):
@@ -55,25 +82,112 @@ class Stop:
     elif self.station != other.station:
       return self.station.name < other.station.name
     else:
-      time_a = self.departure_time or self.arrival_time or None
-      time_b = other.departure_time or other.arrival_time or None
-      return time_a < time_b
+      return self.get_time() < other.get_time()
 
   # Convert to string
   def __str__(self):
     return "{:<12}  {:<10}  {}".format(
-      "{:>5} A  {:>3}".format(str(self.arrival_time),self.arrival_platform) if self.arrival_time else '',
-      "{:>5}  {:>3}".format(str(self.departure_time),self.departure_platform) if self.departure_time else '',
+      "{:>5} A  {:>3}".format(str(self.arrival_time),self.arrival_platform) if self.arrival_time is not None else '',
+      "{:>5}  {:>3}".format(str(self.departure_time),self.departure_platform) if self.departure_time is not None else '',
       str(self.station)
     )
 
   # Convert to representation
   def __repr__(self):
     return "Stop({})".format(
-      ", ".join("{0[0]} = {0[1]}".format(item) for item in self.__dict__.items())
+      ", ".join("{} = {}".format(name,getattr(self,name)) for name in self.__slots__)
     )
 
 
+# Stop table class, which stores the stations, platforms and times shared by compact stops
+class StopTable:
+  # Constructor
+  def __init__(self):
+    self.stations = []
+    self.station_indices = {}
+    self.platforms = ['']
+    self.platform_indices = {'': 0}
+    self.times = {-1: None}
+
+  # Return the index of a station
+  def get_station_index(self, station):
+    key = station.id if station is not None else None
+    if key not in self.station_indices:
+      self.station_indices[key] = len(self.stations)
+      self.stations.append(station)
+    return self.station_indices[key]
+
+  # Return the index of a platform
+  def get_platform_index(self, platform):
+    if platform not in self.platform_indices:
+      self.platform_indices[platform] = len(self.platforms)
+      self.platforms.append(platform)
+    return self.platform_indices[platform]
+
+  # Return a shared time for a number of minutes, or None if the minutes are -1
+  def get_time(self, minutes):
+    if minutes not in self.times:
+      self.times[minutes] = Time(0,minutes)
+    return self.times[minutes]
+
+
+# Compact stop list class, which stores stops in typed arrays and creates them on demand
+class CompactStops(Sequence):
+  # Attributes of a compact stop list
+  __slots__ = ('table','stations','arrival_times','arrival_platforms','departure_times','departure_platforms')
+
+  # Constructor
+  def __init__(self, table, stops):
+    self.table = table
+    self.stations = array('i',(table.get_station_index(stop.station) for stop in stops))
+    self.arrival_times = array('h',(int(stop.arrival_time) if stop.arrival_time is not None else -1 for stop in stops))
+    self.arrival_platforms = array('H',(table.get_platform_index(stop.arrival_platform) for stop in stops))
+    self.departure_times = array('h',(int(stop.departure_time) if stop.departure_time is not None else -1 for stop in stops))
+    self.departure_platforms = array('H',(table.get_platform_index(stop.departure_platform) for stop in stops))
+
+  # Create a compact stop list from arrays that already refer to the table
+  @classmethod
+  def from_arrays(cls, table, stations, arrival_times, arrival_platforms, departure_times, departure_platforms):
+    stops = cls.__new__(cls)
+    stops.table = table
+    stops.stations = stations
+    stops.arrival_times = arrival_times
+    stops.arrival_platforms = arrival_platforms
+    stops.departure_times = departure_times
+    stops.departure_platforms = departure_platforms
+    return stops
+
+  # Create a stop from the arrays
+  def _create_stop(self, station, arrival_time, arrival_platform, departure_time, departure_platform):
+    table = self.table
+    return Stop.create(table.stations[station],table.get_time(arrival_time),table.platforms[arrival_platform],table.get_time(departure_time),table.platforms[departure_platform])
+
+  # Return the number of stops
+  def __len__(self):
+    return len(self.stations)
+
+  # Return a stop, or a list of stops for a slice
+  def __getitem__(self, index):
+    if isinstance(index,slice):
+      return [self[stop_idx] for stop_idx in range(*index.indices(len(self)))]
+    return self._create_stop(self.stations[index],self.arrival_times[index],self.arrival_platforms[index],self.departure_times[index],self.departure_platforms[index])
+
+  # Iterate over the stops
+  def __iter__(self):
+    for arrays in zip(self.stations,self.arrival_times,self.arrival_platforms,self.departure_times,self.departure_platforms):
+      yield self._create_stop(*arrays)
+
+  # Return if this stop list is equal to another stop list
+  def __eq__(self, other):
+    return isinstance(other,Sequence) and list(self) == list(other)
+
+
+# Station flags of a service
+ARRIVING = 1
+DEPARTING = 2
+PASSING = 4
+
+
 # Service class
 class Service:
   # Constructor
@@ -87,33 +201,42 @@ class Service:
     self.attributes = kwargs.get('attributes') or []
     self.stops = kwargs.get('stops') or []
 
-  # Slice the stops of this service
+  # Slice the stops of this service into a segment view
   def slice(self, start = None, end = None):
-    service = copy(self)
-    service.stops = service.stops[start:end]
-
-    service.stops[0].arrival_time = None
-    service.stops[0].arrival_platform = ''
-    service.stops[-1].departure_time = None
-    service.stops[-1].departure_platform = ''
-
-    return service
+    start, end, step = slice(start,end).indices(len(self.stops))
+    return ServiceSegment(self,start,end)
+
+  # Return the position and flags of every station of this service, building them on first use
+  def get_station_positions(self):
+    positions = self.__dict__.get('_station_positions')
+    if positions is None:
+      positions = {}
+      for stop_idx, stop in enumerate(self.stops):
+        key = stop.station.id if stop.station is not None else None
+        flags = (ARRIVING if stop.is_arriving() else 0) | (DEPARTING if stop.is_departing() else 0) or PASSING
+        if key in positions:
+          positions[key] = (positions[key][0],positions[key][1] | flags)
+        else:
+          positions[key] = (stop_idx,flags)
+      self._station_positions = positions
+    return positions
+
+  # Return the position and flags of a station in this service, or None if it is not in this service
+  def _get_station_position(self, station):
+    return self.get_station_positions().get(station.id if station is not None else None)
 
   # Return the stop if this service has a station
   def get_by_station(self, station):
-    try:
-      return next(stop for stop in self.stops if stop.station == station)
-    except StopIteration:
-      return None
+    position = self._get_station_position(station)
+    return self.stops[position[0]] if position is not None else None
 
   # Slice the stops of this service by station
   def slice_by_station(self, start = None, end = None):
-    try:
-      start_idx = self.stops.index(self.get_by_station(start)) if start else None
-      end_idx = self.stops.index(self.get_by_station(end)) if end else None
-      return self.slice(start_idx,end_idx)
-    except ValueError as err:
-      raise ValueError("This service does not pass the entered station: {}".format(err))
+    start_position = self._get_station_position(start) if start else None
+    end_position = self._get_station_position(end) if end else None
+    if (start and start_position is None) or (end and end_position is None):
+      raise ValueError("This service does not pass the entered station: {}".format(start if start_position is None else end))
+    return self.slice(start_position[0] if start else None,end_position[0] if end else None)
 
   # Return is this service is valid on a given date
   def valid_on(self, date):
@@ -121,19 +244,27 @@ class Service:
 
   # Return if this service has a departure from a station
   def stops_at(self, station):
-    return station in (stop.station for stop in self.stops if stop.is_departing() or stop.is_arriving())
+    position = self._get_station_position(station)
+    return position is not None and position[1] & (ARRIVING | DEPARTING) != 0
 
   # Return if this service has a departure from a station
   def departs_from(self, station):
-    return station in (stop.station for stop in self.stops if stop.is_departing())
+    position = self._get_station_position(station)
+    return position is not None and position[1] & DEPARTING != 0
 
   # Return if this service has a arrival at a station
   def arrives_at(self, station):
-    return station in (stop.station for stop in self.stops if stop.is_arriving())
+    position = self._get_station_position(station)
+    return position is not None and position[1] & ARRIVING != 0
 
   # Return if this service passes a station
   def passes(self, station):
-    return station in (stop.station for stop in self.stops if stop.is_passing())
+    position = self._get_station_position(station)
+    return position is not None and position[1] & PASSING != 0
+
+  # Return the state to pickle this service, without the station positions
+  def __getstate__(self):
+    return {name: value for name, value in self.__dict__.items() if name != '_station_positions'}
 
   # Return if this service is equal to another service
   def __eq__(self, other):
@@ -160,7 +291,7 @@ class Service:
 
   # Return the hash for this service
   def __hash__(self):
-    return hash((self.id,self.company,self.variant,self.name,self.footnote,self.transport_mode,self.attributes,self.stops))
+    return hash((self.id,self.company,self.variant,self.name,self.footnote,self.transport_mode,tuple(self.attributes),tuple(self.stops)))
 
   # Convert to string
   def __str__(self):
@@ -173,20 +304,332 @@ class Service:
       self.stops[-1].station
     )
 
+  # Store the stops of this service in a compact stop list
+  def compact(self, table):
+    if not isinstance(self.stops,CompactStops):
+      self.stops = CompactStops(table,self.stops)
+    return self
+
+
+# Segment stop list class, which presents a range of stops without arrival at the first and departure at the last stop
+class SegmentStops(Sequence):
+  # Attributes of a segment stop list
+  __slots__ = ('stops','start','end')
+
+  # Constructor
+  def __init__(self, stops, start, end):
+    self.stops = stops
+    self.start = start
+    self.end = end
+
+  # Return a stop of the underlying list, trimmed if it is the first or last stop
+  def _get_stop(self, index):
+    stop = self.stops[self.start + index]
+    first = index == 0
+    last = index == self.end - self.start - 1
+    if not first and not last:
+      return stop
+    return Stop.create(stop.station,
+      None if first else stop.arrival_time,
+      '' if first else stop.arrival_platform,
+      None if last else stop.departure_time,
+      '' if last else stop.departure_platform
+    )
+
+  # Return the number of stops
+  def __len__(self):
+    return self.end - self.start
+
+  # Return a stop, or a list of stops for a slice
+  def __getitem__(self, index):
+    if isinstance(index,slice):
+      return [self._get_stop(stop_idx) for stop_idx in range(*index.indices(len(self)))]
+    if index < 0:
+      index += len(self)
+    if index < 0 or index >= len(self):
+      raise IndexError("Stop index out of range")
+    return self._get_stop(index)
+
+  # Iterate over the stops
+  def __iter__(self):
+    for index in range(len(self)):
+      yield self._get_stop(index)
+
+  # Return if this stop list is equal to another stop list
+  def __eq__(self, other):
+    return isinstance(other,Sequence) and list(self) == list(other)
+
+
+# Service segment class, which is a view on a non-empty range of stops of a service
+class ServiceSegment(Service):
+  # Constructor
+  def __init__(self, service, start, end):
+    if end <= start:
+      raise ValueError("The segment of the service has no stops: {}:{}".format(start,end))
+    self.service = service
+    self.start = start
+    self.end = end
+
+  # Return the attributes of the service
+  id = property(lambda self: self.service.id)
+  company = property(lambda self: self.service.company)
+  variant = property(lambda self: self.service.variant)
+  name = property(lambda self: self.service.name)
+  footnote = property(lambda self: self.service.footnote)
+  transport_mode = property(lambda self: self.service.transport_mode)
+  attributes = property(lambda self: self.service.attributes)
+
+  # Return the stops of the segment
+  @property
+  def stops(self):
+    return SegmentStops(self.service.stops,self.start,self.end)
+
+  # Slice the stops of this segment into a segment view of the service
+  def slice(self, start = None, end = None):
+    start, end, step = slice(start,end).indices(self.end - self.start)
+    return ServiceSegment(self.service,self.start + start,self.start + end)
+
+  # Store the stops of the service in a compact stop list, since the stops of a segment are a view on them
+  def compact(self, table):
+    self.service.compact(table)
+    return self
+
+
+# Station index class, which keeps the stops of every station sorted by their time and the arriving stops sorted by their arrival time
+class StationIndex:
+  # Constructor
+  def __init__(self, services):
+    self.times = {}
+    self.entries = {}
+    self.arrival_times = {}
+    self.arrival_entries = {}
+
+    # Collect the stops of every service per station
+    for service in services:
+      for stop_idx, stop in enumerate(service.stops):
+        if stop.station is not None and not stop.is_passing():
+          self.entries.setdefault(stop.station.id,[]).append((stop.get_time(),stop_idx,service))
+          if stop.is_arriving():
+            self.arrival_entries.setdefault(stop.station.id,[]).append((stop.arrival_time,stop_idx,service))
+
+    # Sort the entries per station by time
+    for entries, times in ((self.entries,self.times),(self.arrival_entries,self.arrival_times)):
+      for station_id, station_entries in entries.items():
+        station_entries.sort(key = itemgetter(0))
+        times[station_id] = [entry[0] for entry in station_entries]
+
+  # Return the entries for a station within a time window, using the arrival times if requested
+  def get(self, station, from_time = None, to_time = None, arrivals = False):
+    entries = self.arrival_entries if arrivals else self.entries
+    times = (self.arrival_times if arrivals else self.times).get(station.id)
+    if times is None:
+      return []
+
+    start = bisect_left(times,from_time) if from_time is not None else 0
+    end = bisect_right(times,to_time) if to_time is not None else len(times)
+    return entries[station.id][start:end]
+
+
+# Number of day timetables that a service list keeps
+DAY_TIMETABLES = 3
+
+# Lock that guards creating the day timetables lock of a service list
+_service_list_lock = threading.Lock()
+
+
+# Return the offset of a timezone on a date, or no offset if the date is not in its period
+def get_timezone_offset(timezone, date):
+  if timezone is None or getattr(timezone,'offset',None) is None:
+    return timedelta(0)
+  elif date < timezone.first_day or date > timezone.last_day:
+    return timedelta(0)
+  else:
+    return timezone.offset
+
+
+# Day timetable class, which holds the services that are valid on a single date with their indexes
+class DayTimetable:
+  # Constructor
+  def __init__(self, date, services):
+    self.date = date
+    self.services = services
+    self.station_index = services.get_station_index()
+    self.midnight = datetime.combine(date,datetime.min.time())
+    self.offsets = {}
+
+    # Collect the stops of all services and sort them by time
+    events = [(int(stop.get_time()),stop_idx,service)
+      for service in services
+      for stop_idx, stop in enumerate(service.stops) if not stop.is_passing()]
+    events.sort(key = itemgetter(0))
+    self.event_times = array('i',(event[0] for event in events))
+    self.events = [event[1:] for event in events]
+
+  # Return the local date and time of a stop, or of a time at the station of a stop
+  def get_datetime(self, stop, time = None):
+    time = time if time is not None else stop.get_time()
+    timezone = getattr(stop.station,'time_zone',None)
+    if timezone not in self.offsets:
+      self.offsets[timezone] = get_timezone_offset(timezone,self.date)
+    return self.midnight + timedelta(minutes = int(time)) + self.offsets[timezone]
+
+  # Return the stops of all stations within a time window as tuples of stop index and service
+  def get_events(self, from_time = None, to_time = None):
+    start = bisect_left(self.event_times,int(from_time)) if from_time is not None else 0
+    end = bisect_right(self.event_times,int(to_time)) if to_time is not None else len(self.event_times)
+    return self.events[start:end]
+
+  # Map the stops at a given station within a time window to a timetable, windowing the stops on their arrival times if requested
+  def _timetable(self, station, from_time, to_time, predicate, arrivals = False):
+    return Timetable(TimetableItem(service.stops[stop_idx],service)
+      for time, stop_idx, service in self.station_index.get(station,from_time,to_time,arrivals)
+      if predicate(service.stops[stop_idx]))
+
+  # Map services that stop at a given station to a timetable
+  def timetable_stops_at(self, station, from_time = None, to_time = None):
+    return self._timetable(station,from_time,to_time,lambda stop: True)
+
+  # Map services that depart from a given station to a timetable
+  def timetable_departs_from(self, station, from_time = None, to_time = None):
+    return self._timetable(station,from_time,to_time,Stop.is_departing)
+
+  # Map services that arrive at a given station within a window of arrival times to a timetable
+  def timetable_arrives_at(self, station, from_time = None, to_time = None):
+    return self._timetable(station,from_time,to_time,Stop.is_arriving,True)
+
 
 # Service list class
 class ServiceList(list):
+  # Footnote file used to check the validity of services on a date
+  footnotes = None
+
+  # Station index, built on first use
+  _station_index = None
+
+  # Day timetables of the last used dates
+  _day_timetables = None
+
+  # Lock that guards the day timetables, created on first use
+  _day_timetables_lock = None
+
   # Constructor
-  def __init__(self, items = []):
+  def __init__(self, items = [], footnotes = None):
     self.extend(items)
+    self.footnotes = footnotes
+
+  # Return the state to pickle this list, without the indexes
+  def __getstate__(self):
+    return dict(self.__dict__,_station_index = None,_day_timetables = None,_day_timetables_lock = None)
+
+  # Clear the indexes, which are built again on first use after the list changed
+  def _invalidate(self):
+    self._station_index = None
+    self._day_timetables = None
+
+  # Append a service
+  def append(self, service):
+    list.append(self,service)
+    self._invalidate()
+
+  # Append multiple services
+  def extend(self, services):
+    list.extend(self,services)
+    self._invalidate()
+
+  # Append multiple services in place
+  def __iadd__(self, services):
+    self.extend(services)
+    return self
+
+  # Insert a service
+  def insert(self, index, service):
+    list.insert(self,index,service)
+    self._invalidate()
+
+  # Replace a service or a slice of services
+  def __setitem__(self, index, value):
+    list.__setitem__(self,index,value)
+    self._invalidate()
+
+  # Delete a service or a slice of services
+  def __delitem__(self, index):
+    list.__delitem__(self,index)
+    self._invalidate()
+
+  # Remove a service
+  def remove(self, service):
+    list.remove(self,service)
+    self._invalidate()
+
+  # Remove and return a service
+  def pop(self, index = -1):
+    service = list.pop(self,index)
+    self._invalidate()
+    return service
+
+  # Remove all services
+  def clear(self):
+    list.clear(self)
+    self._invalidate()
+
+  # Return the station index for this list
+  def get_station_index(self):
+    if self._station_index is None:
+      self._station_index = StationIndex(self)
+    return self._station_index
+
+  # Return the lock that guards the day timetables of this list
+  def _get_day_timetables_lock(self):
+    if self._day_timetables_lock is None:
+      with _service_list_lock:
+        if self._day_timetables_lock is None:
+          self._day_timetables_lock = threading.Lock()
+    return self._day_timetables_lock
+
+  # Return the day timetable for a date, or for today if no date is given, keeping the last used dates
+  def for_date(self, date = None):
+    date = date if date is not None else Date.today()
+    lock = self._get_day_timetables_lock()
+
+    # Return the day timetable if it is kept
+    with lock:
+      if self._day_timetables is None:
+        self._day_timetables = OrderedDict()
+      day_timetables = self._day_timetables
+      if date in day_timetables:
+        day_timetables.move_to_end(date)
+        return day_timetables[date]
+
+    # Build the day timetable outside the lock, so callers for other dates do not wait for it
+    day_timetable = DayTimetable(date,self.filter_valid_on(date))
+
+    # Keep the day timetable unless another caller kept one first or the list changed meanwhile, and drop the least recently used dates
+    with lock:
+      if day_timetables is not self._day_timetables:
+        return day_timetable
+      if date in day_timetables:
+        day_timetables.move_to_end(date)
+        return day_timetables[date]
+      day_timetables[date] = day_timetable
+      while len(day_timetables) > DAY_TIMETABLES:
+        day_timetables.popitem(last = False)
+      return day_timetable
 
   # Get services that qualify to a filter
   def filter(self, filter):
-    return ServiceList(service for service in self if filter(service))
+    return ServiceList((service for service in self if filter(service)),self.footnotes)
+
+  # Return a function that checks if a service is valid on a given date
+  def _valid_on(self, date):
+    if self.footnotes is None:
+      return lambda service: service.valid_on(date)
+
+    valid_ids = self.footnotes.valid_on(date)
+    return lambda service: service.footnote is not None and service.footnote.id in valid_ids
 
   # Get services that are valid on a given date
   def filter_valid_on(self, date):
-    return self.filter(lambda service: service.valid_on(date))
+    return self.filter(self._valid_on(date))
 
   # Get services that stop at a given station
   def filter_stops_at(self, station):
@@ -198,34 +641,46 @@ class ServiceList(list):
 
   # Get services that arrive at a given station
   def filter_arrives_at(self, station):
-    return self.filter(lambda service: service.arrives_at(Station))
+    return self.filter(lambda service: service.arrives_at(station))
 
   # Get services that pass a given station
   def filter_passes(self, station):
-    return self.filter(lambda service: service.passes(Station))
+    return self.filter(lambda service: service.passes(station))
+
+  # Map the stops at a given station within a time window to a timetable, windowing the stops on their arrival times if requested
+  def _timetable(self, date, station, from_time, to_time, predicate, arrivals = False):
+    valid_on = self._valid_on(date)
+    return Timetable(TimetableItem(service.stops[stop_idx],service)
+      for time, stop_idx, service in self.get_station_index().get(station,from_time,to_time,arrivals)
+      if predicate(service.stops[stop_idx]) and valid_on(service))
 
   # Map services that stop at a given station to a timetable
-  def timetable_stops_at(self, date, station):
-    return Timetable(TimetableItem(service.get_by_station(station),service) for service in self.filter_valid_on(date).filter_stops_at(station))
+  def timetable_stops_at(self, date, station, from_time = None, to_time = None):
+    return self._timetable(date,station,from_time,to_time,lambda stop: True)
 
   # Map services that depart from a given station to a timetable
-  def timetable_departs_from(self, date, station):
-    return Timetable(TimetableItem(service.get_by_station(station),service) for service in self.filter_valid_on(date).filter_departs_from(station))
+  def timetable_departs_from(self, date, station, from_time = None, to_time = None):
+    return self._timetable(date,station,from_time,to_time,Stop.is_departing)
 
-  # Map services that arrive at a given station to a timetable
-  def timetable_arrives_at(self, date, station):
-    return Timetable(TimetableItem(service.get_by_station(station),service) for service in self.filter_valid_on(date).filter_arrives_at(station))
+  # Map services that arrive at a given station within a window of arrival times to a timetable
+  def timetable_arrives_at(self, date, station, from_time = None, to_time = None):
+    return self._timetable(date,station,from_time,to_time,Stop.is_arriving,True)
 
 
 # Timetable item tuple
 TimetableItem = namedtuple('TimetableItem',['stop','service'])
 
 
+# Return the sort key of a timetable item, which orders like the stops but compares natively
+def timetable_key(item):
+  return (item.stop.station.name,item.stop.get_time())
+
+
 # Timetable class
 class Timetable(SortedListWithKey):
   # Constructor
   def __init__(self, iterable = None):
-    return SortedListWithKey.__init__(self,iterable,lambda item: item.stop)
+    return SortedListWithKey.__init__(self,iterable,timetable_key)
 
   # Add two timetables
   def __add__(self, other):
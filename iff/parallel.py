@@ -0,0 +1,124 @@
+from iff.model import StopTable, CompactStops, Service
+from iff.delivery import IdentificationRecord
+from iff.service import ServiceFile, read_services
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import io
+import mmap
+import os
+
+# Number of chunks per process, to balance the load between the processes
+CHUNKS_PER_PROCESS = 4
+
+
+# Reference class that resolves a key to the key itself
+class _KeyReference:
+  # Return the key
+  def get(self, key):
+    return key
+
+
+# Context class that resolves references to their ids
+class ReferenceContext:
+  # Constructor
+  def __init__(self):
+    self.companies = _KeyReference()
+    self.footnotes = _KeyReference()
+    self.transport_modes = _KeyReference()
+    self.attributes = _KeyReference()
+    self.stations = _KeyReference()
+
+
+# Return the offsets of the chunks of a file, split at service records
+def chunk_offsets(file_name, chunks):
+  with open(file_name,'rb') as file, mmap.mmap(file.fileno(),0,access = mmap.ACCESS_READ) as buffer:
+    # Skip the identification record
+    offsets = [buffer.find(b'\n') + 1]
+
+    # Find the first service record after every chunk boundary
+    for chunk in range(1,chunks):
+      position = buffer.find(b'\n#',max(offsets[-1],len(buffer) * chunk // chunks))
+      if position < 0:
+        break
+      offsets.append(position + 1)
+
+    offsets.append(len(buffer))
+    return offsets
+
+# Return the minutes of a time, or -1 if there is no time
+def _get_minutes(time):
+  return int(time) if time is not None else -1
+
+# Read the services in a chunk of a file as tuples of ids and their stops as typed arrays of indices into the station codes and platforms of the chunk
+def read_chunk(file_name, start, end):
+  # Read the chunk and decode it like the other files
+  with open(file_name,'rb') as file:
+    file.seek(start)
+    strings = io.TextIOWrapper(io.BytesIO(file.read(end - start)))
+
+  # Initialize the arrays
+  services = []
+  station_indices = {}
+  platform_indices = {'': 0}
+  stations = array('i')
+  arrival_times = array('h')
+  arrival_platforms = array('H')
+  departure_times = array('h')
+  departure_platforms = array('H')
+
+  # Convert the services to tuples and append their stops to the arrays
+  for service in read_services(strings,ReferenceContext()):
+    services.append((service.id,service.company,service.variant,service.name,service.footnote,service.transport_mode,tuple(service.attributes),len(service.stops)))
+    for stop in service.stops:
+      stations.append(station_indices.setdefault(stop.station,len(station_indices)))
+      arrival_times.append(_get_minutes(stop.arrival_time))
+      arrival_platforms.append(platform_indices.setdefault(stop.arrival_platform,len(platform_indices)))
+      departure_times.append(_get_minutes(stop.departure_time))
+      departure_platforms.append(platform_indices.setdefault(stop.departure_platform,len(platform_indices)))
+
+  return services, list(station_indices), list(platform_indices), (stations,arrival_times,arrival_platforms,departure_times,departure_platforms)
+
+# Read a TIMETBLS file using a pool of processes, storing the stops compactly so they are not created again in this process
+def read_services_parallel(file_name, context, processes = None):
+  processes = processes or os.cpu_count() or 1
+
+  # Create a new file
+  with open(file_name) as file:
+    identification_record = IdentificationRecord.read(next(file),context)
+  timetable_file = ServiceFile(identification_record)
+  timetable_file.footnotes = context.footnotes
+  timetable_file.stop_table = table = StopTable()
+
+  # Read the chunks in parallel and append the services in order
+  offsets = chunk_offsets(file_name,processes * CHUNKS_PER_PROCESS)
+  with ProcessPoolExecutor(processes) as executor:
+    for services, codes, platforms, arrays in executor.map(read_chunk,repeat(file_name),offsets[:-1],offsets[1:]):
+      # Map the indices of the chunk to indices of the stop table
+      station_indices = [table.get_station_index(context.stations.get(code)) for code in codes]
+      platform_indices = [table.get_platform_index(platform) for platform in platforms]
+      stations, arrival_times, arrival_platforms, departure_times, departure_platforms = arrays
+      stations = array('i',map(station_indices.__getitem__,stations))
+      arrival_platforms = array('H',map(platform_indices.__getitem__,arrival_platforms))
+      departure_platforms = array('H',map(platform_indices.__getitem__,departure_platforms))
+
+      # Create the services, which wrap slices of the arrays
+      offset = 0
+      for id, company, variant, name, footnote, transport_mode, attributes, stop_count in services:
+        end = offset + stop_count
+        timetable_file.append(Service(
+          id = id,
+          company = context.companies.get(company),
+          variant = variant,
+          name = name,
+          footnote = context.footnotes.get(footnote),
+          transport_mode = context.transport_modes.get(transport_mode),
+          attributes = [context.attributes.get(attribute) for attribute in attributes],
+          stops = CompactStops.from_arrays(table,stations[offset:end],arrival_times[offset:end],arrival_platforms[offset:end],departure_times[offset:end],departure_platforms[offset:end])
+        ))
+        offset = end
+
+  # Return the file
+  return timetable_file
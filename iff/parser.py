@@ -1,15 +1,21 @@
 from datetime import datetime, date, timedelta
 from collections import OrderedDict
 
+import copyreg
+
 # Date base class
 class Date(date):
   # Return a new instance
   def __new__(cls, year, month, day):
     return date.__new__(cls, year, month, day)
 
-  # Return the date at a given time (Time class)
+  # Return the date at a given time (Time class), which can be past midnight
   def at_time(self, time):
-    return datetime.combine(self,time.min + time)
+    return datetime.combine(self,datetime.min.time()) + timedelta(minutes = time)
+
+  # Return the arguments to pickle this date
+  def __reduce__(self):
+    return (self.__class__,(self.year,self.month,self.day))
 
   # Convert to string
   def __str__(self):
@@ -22,17 +28,33 @@ class Date(date):
     return cls(date.year,date.month,date.day)
 
 
-# Time base class
-class Time(timedelta):
+# Time base class, which stores the minutes since the start of the service day
+class Time(int):
   # Return a new instance
   def __new__(cls, hours, minutes):
-    return timedelta.__new__(cls, hours = hours, minutes = minutes)
+    return int.__new__(cls,hours * 60 + minutes)
+
+  # Return the hours since the start of the service day
+  @property
+  def hours(self):
+    return int(self) // 60
+
+  # Return the minutes within the hour
+  @property
+  def minutes(self):
+    return int(self) % 60
+
+  # Return the arguments to pickle this time
+  def __reduce__(self):
+    return (self.__class__,(0,int(self)))
 
   # Convert to string
   def __str__(self):
-    hours = int(self.seconds / 3600)
-    minutes = int(self.seconds / 60 % 60)
-    return "{:d}:{:02d}".format(hours % 24,minutes)
+    return "{:d}:{:02d}".format(self.hours % 24,self.minutes)
+
+  # Convert to representation
+  def __repr__(self):
+    return "Time({:d}, {:d})".format(self.hours,self.minutes)
 
   # Parse a HHMM format
   @classmethod
@@ -54,13 +76,22 @@ class Record:
 
   # Return the hash for this record
   def __hash__(self):
-    return hash((type(self),self.__dict__))
+    return hash((type(self),tuple(sorted(self.__dict__.items()))))
 
   # Convert to string
   def __str__(self):
     return "{}: {}".format(self.__class__.__name__,self.__dict__)
 
 
+# Reference record base class, which is interned per delivery by its file and compared by identity
+class ReferenceRecord(Record):
+  # Return if this record is the same record as another record
+  __eq__ = object.__eq__
+
+  # Return the hash for this record, which is based on its identity
+  __hash__ = object.__hash__
+
+
 # File base class
 class File:
   # Constructor
@@ -76,7 +107,15 @@ class File:
 class Database(OrderedDict):
   # Constructor
   def __init__(self):
-    OrderedDict.__init__(self,identification_record)
+    OrderedDict.__init__(self)
+
+  # Return the state to pickle this database, which OrderedDict does not define before Python 3.11
+  def __getstate__(self):
+    return dict(vars(self))
+
+  # Return the arguments to pickle this database
+  def __reduce__(self):
+    return (copyreg.__newobj__,(self.__class__,),self.__getstate__(),None,iter(self.items()))
 
   # Add a record
   def add(self, record):
@@ -0,0 +1,93 @@
+from iff.reload import DeliveryHandle
+
+from collections import OrderedDict
+
+import threading
+import time
+
+# Query types and the timetable method they call
+QUERY_TYPES = {
+  'stops': 'timetable_stops_at',
+  'departures': 'timetable_departs_from',
+  'arrivals': 'timetable_arrives_at'
+}
+
+
+# Board query class, which caches timetable queries on the current delivery of a handle
+class BoardQuery:
+  # Constructor
+  def __init__(self, handle, max_size = 4096, ttl = 300, clock = time.monotonic):
+    self.handle = handle if isinstance(handle,DeliveryHandle) else DeliveryHandle(handle)
+    self.max_size = max_size
+    self.ttl = ttl
+    self.clock = clock
+    self.hits = 0
+    self.misses = 0
+    self.invalidations = 0
+    self._iff = None
+    self._cache = OrderedDict()
+    self._lock = threading.Lock()
+
+  # Return a timetable for a query type, using the cache if possible
+  def query(self, type, date, station, from_time = None, to_time = None):
+    if type not in QUERY_TYPES:
+      raise ValueError("Invalid query type: {}".format(type))
+
+    iff = self.handle.current
+    key = (type,date,station.id,from_time,to_time)
+    now = self.clock()
+
+    with self._lock:
+      # Clear the cache if the delivery changed
+      if iff is not self._iff:
+        if self._iff is not None:
+          self.invalidations += 1
+        self._cache.clear()
+        self._iff = iff
+
+      # Return the cached timetable if it did not expire
+      entry = self._cache.get(key)
+      if entry is not None and now - entry[0] < self.ttl:
+        self._cache.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+      self.misses += 1
+
+    # Query the timetable of the day outside the lock
+    timetable = getattr(iff.services.for_date(date),QUERY_TYPES[type])(station,from_time,to_time)
+
+    with self._lock:
+      # Store the timetable if the delivery did not change in the meantime
+      if iff is self._iff:
+        self._cache[key] = (now,timetable)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+          self._cache.popitem(last = False)
+    return timetable
+
+  # Return a timetable of services that stop at a station
+  def stops_at(self, date, station, from_time = None, to_time = None):
+    return self.query('stops',date,station,from_time,to_time)
+
+  # Return a timetable of services that depart from a station
+  def departs_from(self, date, station, from_time = None, to_time = None):
+    return self.query('departures',date,station,from_time,to_time)
+
+  # Return a timetable of services that arrive at a station
+  def arrives_at(self, date, station, from_time = None, to_time = None):
+    return self.query('arrivals',date,station,from_time,to_time)
+
+  # Clear the cache
+  def clear(self):
+    with self._lock:
+      self._cache.clear()
+
+  # Return the cache statistics
+  def get_stats(self):
+    with self._lock:
+      return {
+        'size': len(self._cache),
+        'hits': self.hits,
+        'misses': self.misses,
+        'invalidations': self.invalidations
+      }
@@ -0,0 +1,244 @@
+from iff.parser import Time
+from iff.journey import INFINITY, JourneyLeg
+
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+# Default maximum number of transfers
+MAX_TRANSFERS = 5
+
+
+# Journey tuple
+Journey = namedtuple('Journey',['departure_time','arrival_time','transfers','legs'])
+
+
+# Return if a trip does not overtake another trip, given their times as lists
+def _follows(times, other_times):
+  return all(time >= other_time for time, other_time in zip(times,other_times))
+
+
+# Return if a journey departs no earlier, arrives no later and transfers no more than another journey, and differs from it
+def _dominates(journey, other):
+  if journey.departure_time < other.departure_time or journey.arrival_time > other.arrival_time or journey.transfers > other.transfers:
+    return False
+  return (journey.departure_time,journey.arrival_time,journey.transfers) != (other.departure_time,other.arrival_time,other.transfers)
+
+
+# Route class, which stores the trips of services with the same stop sequence in column major arrays
+class Route:
+  # Constructor
+  def __init__(self, stations, can_board, trips):
+    self.stations = array('i',stations)
+    self.can_board = bytes(can_board)
+    self.trips = array('i',(service_idx for service_idx, stop_indices, arrivals, departures in trips))
+
+    # Store the times and stop indices per position, so the trips at a position are contiguous
+    self.stop_indices = array('i',(trip[1][position] for position in range(len(stations)) for trip in trips))
+    self.arrivals = array('i',(trip[2][position] for position in range(len(stations)) for trip in trips))
+    self.departures = array('i',(trip[3][position] for position in range(len(stations)) for trip in trips))
+
+
+# RAPTOR router class, which finds the Pareto set of journeys by arrival time and number of transfers
+class Raptor:
+  # Constructor
+  def __init__(self, services, stations):
+    self.services = services
+    self.stations = list(stations.values())
+    self.station_indices = {station.id: station_idx for station_idx, station in enumerate(self.stations)}
+    self.change_times = array('i',(station.change_time for station in self.stations))
+    self._valid_services = {}
+    self._station_routes = {}
+
+    # Group the services by their sequence of stations where they stop
+    patterns = {}
+    for service_idx, service in enumerate(services):
+      key = []
+      stop_indices = []
+      arrivals = []
+      departures = []
+      for stop_idx, stop in enumerate(service.stops):
+        station_idx = self.station_indices.get(stop.station.id) if stop.station is not None else None
+        if stop.is_passing() or station_idx is None:
+          continue
+        key.append((station_idx,stop.is_departing()))
+        stop_indices.append(stop_idx)
+        arrivals.append(int(stop.arrival_time) if stop.is_arriving() else INFINITY)
+        departures.append(int(stop.departure_time) if stop.is_departing() else INFINITY)
+      if len(key) > 1:
+        patterns.setdefault(tuple(key),[]).append((service_idx,stop_indices,arrivals,departures))
+
+    # Split every pattern into routes where no trip overtakes another trip
+    self.routes = []
+    for key, trips in patterns.items():
+      trips.sort(key = lambda trip: (trip[3][0],trip[2][-1]))
+      route_trips = []
+      for trip in trips:
+        for other_trips in route_trips:
+          if _follows(trip[2],other_trips[-1][2]) and _follows(trip[3],other_trips[-1][3]):
+            other_trips.append(trip)
+            break
+        else:
+          route_trips.append([trip])
+      for trips in route_trips:
+        self.routes.append(Route([station_idx for station_idx, can_board in key],[can_board for station_idx, can_board in key],trips))
+
+    # Index the routes and positions that serve every station
+    self.station_routes = [[] for station in self.stations]
+    for route_idx, route in enumerate(self.routes):
+      for position, station_idx in enumerate(route.stations):
+        self.station_routes[station_idx].append((route_idx,position))
+
+  # Return a bytearray that flags the services that are valid on a date
+  def get_valid_services(self, date):
+    if date not in self._valid_services:
+      valid_on = self.services._valid_on(date)
+      self._valid_services[date] = bytearray(valid_on(service) for service in self.services)
+    return self._valid_services[date]
+
+  # Return the routes and positions that serve every station with a trip that is valid on a date
+  def get_station_routes(self, date):
+    if date not in self._station_routes:
+      valid_services = self.get_valid_services(date)
+      valid_routes = bytearray(any(valid_services[service_idx] for service_idx in route.trips) for route in self.routes)
+      self._station_routes[date] = [[(route_idx,position) for route_idx, position in station_routes if valid_routes[route_idx]] for station_routes in self.station_routes]
+    return self._station_routes[date]
+
+  # Create the labels of a query
+  def _create_labels(self, rounds):
+    return {
+      'arrivals': [array('i',[INFINITY]) * len(self.stations) for round in range(rounds + 1)],
+      'readies': [array('i',[INFINITY]) * len(self.stations) for round in range(rounds + 1)],
+      'parents': [[None] * len(self.stations) for round in range(rounds + 1)]
+    }
+
+  # Run the rounds for a departure time at the origin, improving the labels of earlier runs and boarding at the origin no later than the last departure time
+  def _run(self, valid_services, station_routes, labels, origin_idx, departure_time, destination_idx, last_departure_time = INFINITY):
+    routes = self.routes
+    change_times = self.change_times
+    arrivals = labels['arrivals']
+    readies = labels['readies']
+    parents = labels['parents']
+
+    # Initialize the origin
+    arrivals[0][origin_idx] = departure_time
+    readies[0][origin_idx] = departure_time
+    marked = {origin_idx}
+
+    for round in range(1,len(arrivals)):
+      # Collect the routes that serve the marked stations with their first marked position
+      queue = {}
+      for station_idx in marked:
+        for route_idx, position in station_routes[station_idx]:
+          if position < queue.get(route_idx,INFINITY):
+            queue[route_idx] = position
+
+      previous_ready = readies[round - 1]
+      arrival = arrivals[round]
+      ready = readies[round]
+      parent = parents[round]
+
+      # Carry the improved arrivals of the previous round over, so an arrival only counts if it is earlier than with fewer trips
+      for station_idx in marked:
+        arrival[station_idx] = min(arrival[station_idx],arrivals[round - 1][station_idx])
+      marked = set()
+
+      # Traverse every route from its first marked position
+      for route_idx, start in queue.items():
+        route = routes[route_idx]
+        trip_count = len(route.trips)
+        trip = -1
+        boarding = -1
+        for position in range(start,len(route.stations)):
+          station_idx = route.stations[position]
+
+          # Improve the arrival at this station with the current trip, but never at the origin, so later rounds cannot board there again
+          if trip >= 0 and station_idx != origin_idx:
+            arrival_time = route.arrivals[position * trip_count + trip]
+            if arrival_time < arrival[station_idx] and (destination_idx is None or arrival_time < arrival[destination_idx]):
+              arrival[station_idx] = arrival_time
+              ready[station_idx] = arrival_time + change_times[station_idx]
+              parent[station_idx] = (route_idx,trip,boarding,position)
+              marked.add(station_idx)
+
+          # Board the earliest valid trip that can be caught at this station
+          ready_time = previous_ready[station_idx]
+          if ready_time != INFINITY and route.can_board[position]:
+            offset = position * trip_count
+            end = offset + (trip if trip >= 0 else trip_count)
+            index = bisect_left(route.departures,ready_time,offset,end)
+            while index < end and not valid_services[route.trips[index - offset]]:
+              index += 1
+            if index < end and (round > 1 or route.departures[index] <= last_departure_time):
+              trip = index - offset
+              boarding = position
+
+      if not marked:
+        break
+
+  # Return the legs of the journey to a station that was reached in a round
+  def _get_legs(self, labels, round, station_idx):
+    legs = []
+    while round > 0:
+      route_idx, trip, boarding, alighting = labels['parents'][round][station_idx]
+      route = self.routes[route_idx]
+      trip_count = len(route.trips)
+      service = self.services[route.trips[trip]]
+      legs.append(JourneyLeg(service,service.stops[route.stop_indices[boarding * trip_count + trip]],service.stops[route.stop_indices[alighting * trip_count + trip]]))
+      station_idx = route.stations[boarding]
+      round -= 1
+    legs.reverse()
+    return legs
+
+  # Return the journeys to the destination that were improved by the last run
+  def _collect(self, labels, destination_idx, previous_arrivals):
+    journeys = []
+    fastest = INFINITY
+    for round, arrival in enumerate(labels['arrivals']):
+      arrival_time = arrival[destination_idx]
+      if round > 0 and arrival_time < fastest and arrival_time < previous_arrivals[round]:
+        legs = self._get_legs(labels,round,destination_idx)
+        journeys.append(Journey(legs[0].departure.departure_time,Time(0,arrival_time),round - 1,legs))
+      fastest = min(fastest,arrival_time)
+    return journeys
+
+  # Return the Pareto set of journeys by arrival time and number of transfers when departing at a time
+  def query(self, date, origin, destination, departure_time, max_transfers = MAX_TRANSFERS):
+    labels = self._create_labels(max_transfers + 1)
+    destination_idx = self.station_indices[destination.id]
+    self._run(self.get_valid_services(date),self.get_station_routes(date),labels,self.station_indices[origin.id],int(departure_time),destination_idx)
+    return self._collect(labels,destination_idx,[INFINITY] * (max_transfers + 2))
+
+  # Return the Pareto set of journeys by departure time, arrival time and number of transfers when departing within a time window
+  def range_query(self, date, origin, destination, from_time, to_time, max_transfers = MAX_TRANSFERS):
+    valid_services = self.get_valid_services(date)
+    station_routes = self.get_station_routes(date)
+    origin_idx = self.station_indices[origin.id]
+    destination_idx = self.station_indices[destination.id]
+    from_time = int(from_time)
+    to_time = int(to_time)
+
+    # Collect the departure times of the valid trips at the origin within the window
+    departure_times = set()
+    for route_idx, position in station_routes[origin_idx]:
+      route = self.routes[route_idx]
+      if not route.can_board[position]:
+        continue
+      trip_count = len(route.trips)
+      for trip in range(trip_count):
+        departure_time = route.departures[position * trip_count + trip]
+        if from_time <= departure_time <= to_time and valid_services[route.trips[trip]]:
+          departure_times.add(departure_time)
+
+    # Run from the latest to the earliest departure, keeping the labels so every run only adds improvements
+    labels = self._create_labels(max_transfers + 1)
+    journeys = []
+    for departure_time in sorted(departure_times,reverse = True):
+      previous_arrivals = [arrival[destination_idx] for arrival in labels['arrivals']]
+      self._run(valid_services,station_routes,labels,origin_idx,departure_time,destination_idx,to_time)
+      journeys.extend(self._collect(labels,destination_idx,previous_arrivals))
+
+    # Remove the journeys that are dominated by another journey
+    journeys = [journey for journey in journeys if not any(_dominates(other,journey) for other in journeys)]
+    journeys.sort(key = lambda journey: (journey.departure_time,journey.transfers))
+    return journeys
@@ -0,0 +1,168 @@
+from iff import IFF
+from iff.delivery import IdentificationRecord
+from iff.model import StopTable
+from iff.service import ServiceFile, read_services
+
+from hashlib import blake2b
+from operator import itemgetter
+
+import os
+import threading
+
+# Reference files in the order they depend on each other
+REFERENCE_FILES = ['timezones', 'countries', 'companies', 'attributes', 'transport_modes', 'stations', 'footnotes']
+
+
+# Return the content of a reference record, where referenced records compare by identity, so a record that references a replaced record counts as changed
+def record_content(record):
+  return tuple(sorted(vars(record).items(),key = itemgetter(0)))
+
+# Return the content hash of a service, which identifies referenced records by their ids
+def content_hash(service):
+  return blake2b(repr((
+    service.id,
+    service.company.id if service.company is not None else None,
+    service.variant,
+    service.name,
+    service.footnote.id if service.footnote is not None else None,
+    service.transport_mode.id if service.transport_mode is not None else None,
+    [attribute.id if attribute is not None else None for attribute in service.attributes],
+    [(stop.station.id if stop.station is not None else None,stop.arrival_time,stop.arrival_platform,stop.departure_time,stop.departure_platform) for stop in service.stops]
+  )).encode(),digest_size = 16).digest()
+
+# Return if two services have the same content and reference the same records
+def same_service(a, b):
+  if a.id != b.id or a.variant != b.variant or a.name != b.name:
+    return False
+  elif a.company is not b.company or a.footnote is not b.footnote or a.transport_mode is not b.transport_mode:
+    return False
+  elif len(a.attributes) != len(b.attributes) or any(x is not y for x, y in zip(a.attributes,b.attributes)):
+    return False
+  elif len(a.stops) != len(b.stops):
+    return False
+  else:
+    return all(x.station is y.station and x.arrival_time == y.arrival_time and x.arrival_platform == y.arrival_platform
+      and x.departure_time == y.departure_time and x.departure_platform == y.departure_platform for x, y in zip(a.stops,b.stops))
+
+
+# Delivery diff class
+class DeliveryDiff:
+  # Constructor
+  def __init__(self, old_identification_record, new_identification_record):
+    self.old_identification_record = old_identification_record
+    self.new_identification_record = new_identification_record
+    self.added_footnotes = []
+    self.removed_footnotes = []
+    self.changed_footnotes = []
+    self.added_services = []
+    self.removed_services = []
+    self.changed_services = []
+    self.kept_services = 0
+
+  # Return if the delivery changed
+  def __bool__(self):
+    return self.old_identification_record != self.new_identification_record
+
+  # Convert to string
+  def __str__(self):
+    return "{} footnotes added, {} removed, {} changed; {} services added, {} removed, {} changed, {} kept".format(
+      len(self.added_footnotes),
+      len(self.removed_footnotes),
+      len(self.changed_footnotes),
+      len(self.added_services),
+      len(self.removed_services),
+      len(self.changed_services),
+      self.kept_services
+    )
+
+
+# Merge a reference file into the file of a new delivery, reusing the unchanged records
+def merge_file(old_file, new_file):
+  added, removed, changed = [], [], []
+
+  # Reuse the old record for every record with the same content
+  for id, record in new_file.items():
+    old_record = old_file.get(id)
+    if old_record is None:
+      added.append(id)
+    elif record_content(old_record) == record_content(record):
+      new_file[id] = old_record
+    else:
+      changed.append(id)
+
+  # Find the removed records
+  removed.extend(id for id in old_file if id not in new_file)
+  return added, removed, changed
+
+# Update a delivery to a new directory and return the new delivery and the diff
+def update(old, directory):
+  new = IFF(directory,compact = old.compact)
+  diff = DeliveryDiff(old.delivery.identification_record,new.delivery.identification_record)
+  if not diff:
+    return old, diff
+
+  # Merge the reference files in dependency order, so the records that are read later reference the merged records
+  for name in REFERENCE_FILES:
+    added, removed, changed = merge_file(getattr(old,name),getattr(new,name))
+    if name == 'footnotes':
+      diff.added_footnotes, diff.removed_footnotes, diff.changed_footnotes = added, removed, changed
+
+  # Index the old services by their content hash
+  old_services = {}
+  for service in old.services:
+    old_services.setdefault(content_hash(service),[]).append(service)
+
+  # Stream the new services and reuse the old services that did not change
+  file_name = os.path.join(directory,"timetbls.dat")
+  with open(file_name) as file:
+    services = ServiceFile(IdentificationRecord.read(next(file),new))
+    services.footnotes = new.footnotes
+    if new.compact:
+      services.stop_table = StopTable()
+
+    for service in read_services(file,new):
+      candidates = old_services.get(content_hash(service),[])
+      match = next((candidate for candidate in candidates if same_service(candidate,service)),None)
+      if match is not None:
+        candidates.remove(match)
+        services.append(match)
+        diff.kept_services += 1
+      else:
+        services.append(service.compact(services.stop_table) if new.compact else service)
+        diff.added_services.append(service)
+
+  # Find the removed services and pair the changed services by company, number and variant
+  diff.removed_services = [service for candidates in old_services.values() for service in candidates]
+  removed_keys = {}
+  for service in diff.removed_services:
+    removed_keys.setdefault((service.company.id if service.company is not None else None,service.id,service.variant),[]).append(service)
+  for service in diff.added_services:
+    candidates = removed_keys.get((service.company.id if service.company is not None else None,service.id,service.variant))
+    if candidates:
+      diff.changed_services.append((candidates.pop(0),service))
+
+  # Leave the changed services out of the added and removed services
+  changed_ids = set(id(service) for pair in diff.changed_services for service in pair)
+  diff.added_services = [service for service in diff.added_services if id(service) not in changed_ids]
+  diff.removed_services = [service for service in diff.removed_services if id(service) not in changed_ids]
+
+  # Set the services on the new delivery
+  if not services.is_valid(new.delivery):
+    raise RuntimeError("The TIMETBLS file is not valid")
+  new.__dict__['services'] = services
+  return new, diff
+
+
+# Delivery handle class, which swaps deliveries atomically so readers keep a consistent view
+class DeliveryHandle:
+  # Constructor
+  def __init__(self, iff):
+    self.current = iff
+    self._lock = threading.Lock()
+
+  # Update the delivery to a new directory and swap it in, returning the diff
+  def reload(self, directory):
+    with self._lock:
+      new, diff = update(self.current,directory)
+      self.current = new
+      return diff
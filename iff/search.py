@@ -0,0 +1,138 @@
+from bisect import bisect_left
+from heapq import nsmallest
+
+import re
+import unicodedata
+
+# Ranks of the ways a term matches a token, where a lower rank is better
+EXACT = 0
+PREFIX = 1
+FUZZY = 2
+
+# Minimum length of a term to search for tokens with typos
+MIN_FUZZY_LENGTH = 5
+
+# Default number of results
+RESULTS = 10
+
+
+# Normalize a string by removing diacritics, folding the case and replacing punctuation with spaces
+def normalize(string):
+  string = ''.join(character for character in unicodedata.normalize('NFKD',string) if not unicodedata.combining(character))
+  return ' '.join(re.sub(r'[^\w]+',' ',string.casefold()).split())
+
+# Return the trigrams of a token, padded at the start so the first characters count as well
+def get_trigrams(token):
+  token = '$$' + token
+  return set(token[index:index + 3] for index in range(len(token) - 2))
+
+# Return the maximum number of typos for a term
+def get_max_distance(term):
+  return 1 if len(term) <= 6 else 2
+
+# Return the Levenshtein distance between a term and the closest prefix of a token, or None if it is larger than the maximum distance
+def prefix_levenshtein(term, token, max_distance):
+  # Only prefixes that are at most the maximum distance longer than the term can match
+  token = token[:len(term) + max_distance]
+  infinity = max_distance + 1
+  previous = [j if j <= max_distance else infinity for j in range(len(token) + 1)]
+  for i in range(1,len(term) + 1):
+    # Only calculate the cells within the maximum distance of the diagonal
+    current = [infinity] * (len(token) + 1)
+    current[0] = i if i <= max_distance else infinity
+    for j in range(max(1,i - max_distance),min(len(token),i + max_distance) + 1):
+      current[j] = min(previous[j] + 1,current[j - 1] + 1,previous[j - 1] + (term[i - 1] != token[j - 1]),infinity)
+
+    # Stop if every alignment already exceeds the maximum distance
+    if min(current) > max_distance:
+      return None
+    previous = current
+  return min(previous) if min(previous) <= max_distance else None
+
+
+# Station search class, which finds stations by the prefixes of the words in their names and their codes, tolerating typos
+class StationSearch:
+  # Constructor
+  def __init__(self, stations):
+    self.stations = list(stations.values())
+    self.names = [normalize(station.name) for station in self.stations]
+
+    # Collect the stations of every token of the names and codes
+    tokens = {}
+    for station_idx, station in enumerate(self.stations):
+      for token in set(self.names[station_idx].split()) | set(normalize(station.id).split()):
+        tokens.setdefault(token,[]).append(station_idx)
+
+    # Store the tokens sorted to find them by prefix
+    self.tokens = sorted(tokens)
+    self.token_stations = [tokens[token] for token in self.tokens]
+
+    # Index the tokens by their trigrams to find them with typos
+    self.trigrams = {}
+    for token_idx, token in enumerate(self.tokens):
+      for trigram in get_trigrams(token):
+        self.trigrams.setdefault(trigram,[]).append(token_idx)
+
+  # Return the indices of the tokens that start with a term
+  def _get_prefix_tokens(self, term):
+    token_idx = bisect_left(self.tokens,term)
+    while token_idx < len(self.tokens) and self.tokens[token_idx].startswith(term):
+      yield token_idx
+      token_idx += 1
+
+  # Return the indices of the tokens that match a term or its prefix with typos, with their distances
+  def _get_fuzzy_tokens(self, term):
+    max_distance = get_max_distance(term)
+    trigrams = get_trigrams(term)
+
+    # Count the shared trigrams of the tokens, where every typo changes at most three trigrams
+    counts = {}
+    for trigram in trigrams:
+      for token_idx in self.trigrams.get(trigram,()):
+        counts[token_idx] = counts.get(token_idx,0) + 1
+    min_count = len(trigrams) - 3 * max_distance
+
+    # Check the distance of the candidates to the term
+    for token_idx, count in counts.items():
+      if count < min_count:
+        continue
+      distance = prefix_levenshtein(term,self.tokens[token_idx],max_distance)
+      if distance is not None:
+        yield token_idx, distance
+
+  # Return the best rank of every station that matches a term
+  def _match(self, term, fuzzy):
+    ranks = {}
+    for token_idx in self._get_prefix_tokens(term):
+      rank = EXACT if self.tokens[token_idx] == term else PREFIX
+      for station_idx in self.token_stations[token_idx]:
+        if rank < ranks.get(station_idx,FUZZY):
+          ranks[station_idx] = rank
+
+    if fuzzy and len(term) >= MIN_FUZZY_LENGTH:
+      for token_idx, distance in self._get_fuzzy_tokens(term):
+        rank = FUZZY + distance
+        for station_idx in self.token_stations[token_idx]:
+          if rank < ranks.get(station_idx,rank + 1):
+            ranks[station_idx] = rank
+    return ranks
+
+  # Return the best matching stations for a query, ranked by their worst matching term, then by the start of their names
+  def search(self, query, k = RESULTS, fuzzy = True):
+    query = normalize(query)
+    terms = query.split()
+    if not terms:
+      return []
+
+    # Keep the stations that match every term with their worst rank
+    ranks = None
+    for term in terms:
+      term_ranks = self._match(term,fuzzy)
+      ranks = term_ranks if ranks is None else {station_idx: max(rank,term_ranks[station_idx]) for station_idx, rank in ranks.items() if station_idx in term_ranks}
+      if not ranks:
+        return []
+
+    # Return the top stations, preferring names that start with the query and shorter names
+    return [self.stations[station_idx] for rank, starts, length, name, station_idx in nsmallest(k,(
+      (rank,not self.names[station_idx].startswith(query),len(self.names[station_idx]),self.names[station_idx],station_idx)
+      for station_idx, rank in ranks.items()))]
@@ -1,8 +1,10 @@
 from iff.parser import Time, Record, File
-from iff.model import Stop, Service, ServiceList
+from iff.model import Stop, StopTable, Service, ServiceList
 from iff.delivery import IdentificationRecord
 
 from copy import copy
+from operator import itemgetter
+from time import perf_counter
 
 # Service record class
 class ServiceRecord(Record):
@@ -141,136 +143,216 @@ identifiers = {
 }
 
 
+# Split a service record in a service for every service number
+def split_services(service_record):
+  # Share the stops between the services if there is only one service number
+  shared = len(service_record.service_numbers) == 1
+
+  # For each service number yield a service
+  for service_number_record in service_record.service_numbers:
+    # Create the stop list
+    stop_idx = 0
+    stops = []
+
+    # Iterate over the stops and append them to the list
+    for stop in service_record.stops:
+      # Check if the service stops here
+      if not stop.is_passing():
+        stop_idx += 1
+
+      # Add the stop if in the boundaries
+      if stop_idx >= service_number_record.first_stop and stop_idx <= service_number_record.last_stop:
+        stops.append(stop)
+
+    # Strip the stops, copying them first if they are shared with other services
+    if not shared:
+      stops[0] = copy(stops[0])
+      stops[-1] = copy(stops[-1])
+    stops[0].arrival_time = None
+    stops[0].arrival_platform = ''
+    stops[-1].departure_time = None
+    stops[-1].departure_platform = ''
+
+    # Yield a new service
+    yield Service(
+      id = service_number_record.service_number,
+      company = service_number_record.company,
+      variant = service_number_record.variant,
+      name = service_number_record.service_name,
+      footnote = service_record.footnote,
+      transport_mode = service_record.transport_mode,
+      attributes = service_record.attributes,
+      stops = stops
+    )
+
+# Column layouts of the records, as precompiled slices of a line
+layouts = {
+  '#': itemgetter(slice(1,9)),
+  '%': itemgetter(slice(1,4),slice(5,10),slice(11,18),slice(18,21),slice(22,25),slice(26,56)),
+  '-': itemgetter(slice(1,6),slice(7,10),slice(11,14)),
+  '&': itemgetter(slice(1,5),slice(6,9),slice(10,13)),
+  '*': itemgetter(slice(1,5),slice(6,9),slice(10,13)),
+  '>': itemgetter(slice(1,8),slice(9,13)),
+  '.': itemgetter(slice(1,8),slice(9,13)),
+  ';': itemgetter(slice(1,8)),
+  '+': itemgetter(slice(1,8),slice(9,13),slice(14,18)),
+  '<': itemgetter(slice(1,8),slice(9,13)),
+  '?': itemgetter(slice(1,6),slice(7,12),slice(13,18))
+}
+
+# Read services from an iterable of lines, decoding the columns directly into stops
+def read_services(strings, context):
+  # Initialize the decoders, which share the stations and times per column value
+  stations = {}
+  times = {}
+
+  def get_station(string):
+    if string not in stations:
+      stations[string] = context.stations.get(string.strip())
+    return stations[string]
+
+  def get_time(string):
+    if string not in times:
+      times[string] = Time.parse(string)
+    return times[string]
+
+  # Initialize local variables
+  current_service = None
+  current_stop = None
+  create_stop = Stop.create
+  stats = getattr(context,'stats',None)
+  split_time = 0.0
+  split_calls = 0
+
+  # Split a service record, adding up the time it takes if statistics are kept, which are recorded once at the end
+  def split(service_record):
+    nonlocal split_time, split_calls
+    if stats is None:
+      return split_services(service_record)
+
+    start_time = perf_counter()
+    services = list(split_services(service_record))
+    split_time += perf_counter() - start_time
+    split_calls += 1
+    return services
+
+  # Iterate over the lines
+  for string in strings:
+    identifier = string[0]
+
+    # Decode the stop records, which are the most common
+    if identifier == '.':
+      station, time = layouts['.'](string)
+      time = get_time(time)
+      current_stop = create_stop(get_station(station),time,'',time,'')
+    elif identifier == ';':
+      current_stop = create_stop(get_station(layouts[';'](string)),None,'',None,'')
+    elif identifier == '+':
+      station, arrival_time, departure_time = layouts['+'](string)
+      current_stop = create_stop(get_station(station),get_time(arrival_time),'',get_time(departure_time),'')
+    elif identifier == '>':
+      station, departure_time = layouts['>'](string)
+      current_stop = create_stop(get_station(station),None,'',get_time(departure_time),'')
+    elif identifier == '<':
+      station, arrival_time = layouts['<'](string)
+      current_stop = create_stop(get_station(station),get_time(arrival_time),'',None,'')
+
+    # Decode the platform record
+    elif identifier == '?':
+      # Check if a stop is selected
+      if current_stop is None:
+        raise RuntimeError("No stop is selected")
+
+      # Set the platforms
+      arrival_platform, departure_platform, footnote = layouts['?'](string)
+      current_stop.arrival_platform = arrival_platform.strip()
+      current_stop.departure_platform = departure_platform.strip()
+      continue
+
+    # Decode the service record
+    elif identifier == '#':
+      # Check if a service is selected, then yield it
+      if current_service is not None:
+        yield from split(current_service)
+
+      # Create a new service
+      current_service = ServiceRecord(id = int(layouts['#'](string)),service_numbers = [],attributes = [],stops = [])
+      current_stop = None
+      continue
+
+    # Decode the other service records
+    elif identifier in layouts:
+      # Check if a service is selected
+      if current_service is None:
+        raise RuntimeError("No service is selected")
+
+      if identifier == '%':
+        company, service_number, variant, first_stop, last_stop, service_name = layouts['%'](string)
+        current_service.service_numbers.append(ServiceNumberRecord(
+          company = context.companies.get(int(company)),
+          service_number = int(service_number),
+          variant = variant.strip(),
+          first_stop = int(first_stop),
+          last_stop = int(last_stop),
+          service_name = service_name.strip()
+        ))
+      elif identifier == '-':
+        current_service.footnote = context.footnotes.get(int(layouts['-'](string)[0]))
+      elif identifier == '&':
+        current_service.transport_mode = context.transport_modes.get(layouts['&'](string)[0].strip())
+      elif identifier == '*':
+        current_service.attributes.append(context.attributes.get(layouts['*'](string)[0].strip()))
+      continue
+
+    else:
+      raise RuntimeError('Invalid record type: {}'.format(identifier))
+
+    # Append the stop
+    if current_service is None:
+      raise RuntimeError("No service is selected")
+    current_service.stops.append(current_stop)
+
+  # Yield the last service
+  if current_service is not None:
+    yield from split(current_service)
+
+  # Record the time of splitting the service records
+  if stats is not None:
+    stats.add_phase('split_services',split_time,split_calls)
+
+# Iterate over the services in a file without keeping them in memory
+def iter_services(file_name, context):
+  # Open the file
+  with open(file_name) as file:
+    # Skip the identification record
+    IdentificationRecord.read(next(file),context)
+
+    # Yield the services
+    yield from read_services(file,context)
+
+
 # Service file
 class ServiceFile(File, ServiceList):
   # Constructor
   def __init__(self, identification_record):
     File.__init__(self,identification_record)
 
-  # Split a service in multiple services
-  def _split_services(self, service_record):
-    # For each service add a service to the file
-    for service_number_record in service_record.service_numbers:
-      # Create the stop list
-      stop_idx = 0
-      stops = []
-
-      # Iterate over the stops and append them to the list
-      for stop in service_record.stops:
-        # Check if the service stops here
-        if not stop.is_passing():
-          stop_idx += 1
-
-        # Add the stop if in the boundaries
-        if stop_idx >= service_number_record.first_stop and stop_idx <= service_number_record.last_stop:
-          stops.append(copy(stop))
-
-      # Strip the stops
-      stops[0].arrival_time = None
-      stops[0].arrival_platform = ''
-      stops[-1].departure_time = None
-      stops[-1].departure_platform = ''
-
-      # Create a new service
-      service = Service(
-        id = service_number_record.service_number,
-        company = service_number_record.company,
-        variant = service_number_record.variant,
-        name = service_number_record.service_name,
-        footnote = service_record.footnote,
-        transport_mode = service_record.transport_mode,
-        attributes = service_record.attributes,
-        stops = stops
-      )
-
-      # Append the service
-      self.append(service)
-
-  # Read a file
+  # Read a file, storing the stops in typed arrays if compact is set
   @classmethod
-  def read(cls, file_name, context):
+  def read(cls, file_name, context, compact = False):
     # Open the file
     with open(file_name) as file:
       # Create a new file
       identification_record = IdentificationRecord.read(next(file),context)
       timetable_file = cls(identification_record)
-
-      # Initialize local variables
-      current_service = None
-      current_stop = None
-
-      # Iterate over the file
-      for string in file:
-        # Get the record belonging to the identifier and parse it
-        identifier = string[0]
-        if identifier not in identifiers:
-          raise RuntimeError('Invalid record type: {}'.format(identifier))
-
-        record = identifiers.get(identifier).read(string,context)
-
-        # Switch the record
-        if isinstance(record,ServiceRecord):
-          # Check if a service is selected, then add it
-          if current_service is not None:
-            timetable_file._split_services(current_service)
-
-          # Create a new service
-          current_service = record
-          current_stop = None
-
-        elif isinstance(record,ServiceNumberRecord):
-          # Check if a service is selected
-          if current_service is None:
-            raise RuntimeError("No service is selected")
-
-          # Append the service number
-          current_service.service_numbers.append(record)
-
-        elif isinstance(record,FootnoteRecord):
-          # Check if a service is selected
-          if current_service is None:
-            raise RuntimeError("No service is selected")
-
-          # Append the footnote
-          current_service.footnote = record.footnote
-
-        elif isinstance(record,TransportModeRecord):
-          # Check if a service is selected
-          if current_service is None:
-            raise RuntimeError("No service is selected")
-
-          # Append the transport mode
-          current_service.transport_mode = record.transport_mode
-
-        elif isinstance(record,AttributeRecord):
-          # Check if a service is selected
-          if current_service is None:
-            raise RuntimeError("No service is selected")
-
-          # Append the attribute
-          current_service.attributes.append(record.attribute)
-
-        elif type(record) in [StartRecord, ContinuationRecord, PassingRecord, IntervalRecord, FinalRecord]:
-          # Check if a service is selected
-          if current_service is None:
-            raise RuntimeError("No service is selected")
-
-          # Append the stop
-          current_stop = Stop(**record.__dict__)
-          current_service.stops.append(current_stop)
-
-        elif isinstance(record,PlatformRecord):
-          # Check if a stop is selected
-          if current_stop is None:
-            raise RuntimeError("No stop is selected")
-
-          # Set the platforms
-          current_stop.arrival_platform = record.arrival_platform_name
-          current_stop.departure_platform = record.departure_platform_name
-
-      # Add the last service
-      if current_service is not None:
-        timetable_file._split_services(current_service)
+      timetable_file.footnotes = context.footnotes
+
+      # Read the services
+      if compact:
+        timetable_file.stop_table = StopTable()
+        timetable_file.extend(service.compact(timetable_file.stop_table) for service in read_services(file,context))
+      else:
+        timetable_file.extend(read_services(file,context))
 
       # Return the file
       return timetable_file
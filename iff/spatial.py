@@ -0,0 +1,101 @@
+from array import array
+from heapq import nsmallest
+
+import math
+
+# Minimum size of the cells of the grid in meters
+MIN_CELL_SIZE = 100
+
+# Walking speed in meters per minute
+WALKING_SPEED = 80
+
+# Default maximum walking distance between stations in meters
+MAX_WALKING_DISTANCE = 500
+
+
+# Grid index class, which finds stations by their Rijksdriehoek coordinates in meters, converted from the kilometers of the STATIONS file
+class GridIndex:
+  # Constructor
+  def __init__(self, stations, cell_size = None):
+    self.stations = list(stations.values())
+    coordinates = [station.get_coordinates() for station in self.stations]
+    self.x_coords = array('i',(x for x, y in coordinates))
+    self.y_coords = array('i',(y for x, y in coordinates))
+
+    # Choose the cell size so there is about one station per cell if no cell size is given
+    if cell_size is None and self.stations:
+      area = (max(self.x_coords) - min(self.x_coords)) * (max(self.y_coords) - min(self.y_coords))
+      cell_size = max(math.sqrt(area / len(self.stations)),MIN_CELL_SIZE)
+    self.cell_size = cell_size or MIN_CELL_SIZE
+
+    # Put every station in the cell that contains it
+    self.cells = {}
+    for station_idx in range(len(self.stations)):
+      self.cells.setdefault(self._get_cell(self.x_coords[station_idx],self.y_coords[station_idx]),[]).append(station_idx)
+
+    # Store the bounds of the cells to know when a search covered all cells
+    self.min_cell = (min((cell[0] for cell in self.cells),default = 0),min((cell[1] for cell in self.cells),default = 0))
+    self.max_cell = (max((cell[0] for cell in self.cells),default = 0),max((cell[1] for cell in self.cells),default = 0))
+
+  # Return the cell that contains a point
+  def _get_cell(self, x, y):
+    return (int(x // self.cell_size),int(y // self.cell_size))
+
+  # Return the squared distance between a point and a station
+  def _get_distance2(self, x, y, station_idx):
+    dx = self.x_coords[station_idx] - x
+    dy = self.y_coords[station_idx] - y
+    return dx * dx + dy * dy
+
+  # Return the nearest stations to a point as a list of distances in meters and stations
+  def nearest(self, x, y, k = 1):
+    cell_x, cell_y = self._get_cell(x,y)
+    candidates = []
+    ring = 0
+
+    # Visit the rings of cells around the cell of the point until the nearest stations are found
+    while True:
+      for cx in range(cell_x - ring,cell_x + ring + 1):
+        for cy in (range(cell_y - ring,cell_y + ring + 1) if cx in (cell_x - ring,cell_x + ring) else (cell_y - ring,cell_y + ring)):
+          for station_idx in self.cells.get((cx,cy),()):
+            candidates.append((self._get_distance2(x,y,station_idx),station_idx))
+
+      # Stop if no unvisited cell can contain a nearer station or if all cells are visited
+      bound = min(x - (cell_x - ring) * self.cell_size,(cell_x + ring + 1) * self.cell_size - x,y - (cell_y - ring) * self.cell_size,(cell_y + ring + 1) * self.cell_size - y)
+      if len(candidates) >= k and nsmallest(k,candidates)[-1][0] <= bound * bound:
+        break
+      if cell_x - ring <= self.min_cell[0] and cell_x + ring >= self.max_cell[0] and cell_y - ring <= self.min_cell[1] and cell_y + ring >= self.max_cell[1]:
+        break
+      ring += 1
+
+    return [(math.sqrt(distance2),self.stations[station_idx]) for distance2, station_idx in nsmallest(k,candidates)]
+
+  # Return the stations within a radius around a point as a list of distances in meters and stations, nearest first
+  def within(self, x, y, radius):
+    min_x, min_y = self._get_cell(x - radius,y - radius)
+    max_x, max_y = self._get_cell(x + radius,y + radius)
+    radius2 = radius * radius
+
+    results = []
+    for cx in range(min_x,max_x + 1):
+      for cy in range(min_y,max_y + 1):
+        for station_idx in self.cells.get((cx,cy),()):
+          distance2 = self._get_distance2(x,y,station_idx)
+          if distance2 <= radius2:
+            results.append((distance2,station_idx))
+
+    results.sort()
+    return [(math.sqrt(distance2),self.stations[station_idx]) for distance2, station_idx in results]
+
+  # Return the nearest stations to a station, without the station itself
+  def nearest_to(self, station, k = 1):
+    return [(distance,other) for distance, other in self.nearest(*station.get_coordinates(),k + 1) if other is not station][:k]
+
+  # Return the walking transfers between stations within a distance as a dict of station ids and lists of stations and minutes
+  def get_footpaths(self, max_distance = MAX_WALKING_DISTANCE, walking_speed = WALKING_SPEED):
+    footpaths = {}
+    for station in self.stations:
+      for distance, other in self.within(*station.get_coordinates(),max_distance):
+        if other is not station:
+          footpaths.setdefault(station.id,[]).append((other,max(math.ceil(distance / walking_speed),1)))
+    return footpaths
@@ -1,4 +1,4 @@
-from iff.parser import Record, File, Database
+from iff.parser import ReferenceRecord, File, Database
 from iff.delivery import IdentificationRecord
 
 # Train changes constants
@@ -6,9 +6,12 @@ NO_TRAN_CHANGES = 0
 TRAN_CHNAGES = 1
 VIRTUAL_STATION = 2
 
+# Meters per unit of the Rijksdriehoek coordinates in the file, which gives them in kilometers
+COORDINATE_UNIT = 1000
+
 
 # Station class
-class StationRecord(Record):
+class StationRecord(ReferenceRecord):
   # Read a record from a string
   @classmethod
   def read(cls, string, context):
@@ -24,6 +27,10 @@ class StationRecord(Record):
       name = string[43:73].strip()
     )
 
+  # Return the Rijksdriehoek coordinates of this station in meters
+  def get_coordinates(self):
+    return self.x_coord * COORDINATE_UNIT, self.y_coord * COORDINATE_UNIT
+
   # Convert to string
   def __str__(self):
     return self.name
@@ -0,0 +1,125 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import sys
+import time
+import tracemalloc
+
+# Use the resource module to read the peak resident set size if it is available
+try:
+  import resource
+except ImportError:
+  resource = None
+
+
+# Return the number of lines in a file
+def count_lines(file_name):
+  lines = 0
+  with open(file_name,'rb') as file:
+    for chunk in iter(lambda: file.read(1048576),b''):
+      lines += chunk.count(b'\n')
+  return lines
+
+
+# File statistics class
+class FileStats:
+  # Constructor
+  def __init__(self, name, file_name):
+    self.name = name
+    self.file_name = file_name
+    self.time = 0.0
+    self.lines = 0
+    self.records = 0
+    self.memory = 0
+
+  # Convert to dict
+  def as_dict(self):
+    return dict(vars(self))
+
+  # Convert to string
+  def __str__(self):
+    return "{:<16} {:>9.3f} s {:>10} lines {:>10} records {:>10.1f} MiB".format(self.name,self.time,self.lines,self.records,self.memory / 1048576)
+
+
+# Load statistics class, which records the time it takes to read the files of a delivery and the memory they take
+class LoadStats:
+  # Constructor, where memory allocations are only traced if requested, because tracing slows reading down several times
+  def __init__(self, trace_memory = False):
+    self.trace_memory = trace_memory
+    self.files = OrderedDict()
+    self.phases = OrderedDict()
+    self._frames = []
+
+  # Return the current and peak memory, which is traced or else the peak resident set size
+  def _get_memory(self):
+    if self.trace_memory:
+      return tracemalloc.get_traced_memory()
+    elif resource is not None:
+      peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+      return peak, peak
+    else:
+      return 0, 0
+
+  # Measure the reading of a file, where the time excludes the files that are read while reading it
+  @contextmanager
+  def measure(self, name, file_name):
+    file_stats = FileStats(name,file_name)
+
+    # Trace memory allocations while the outermost file is read if requested
+    started = self.trace_memory and not tracemalloc.is_tracing()
+    if started:
+      tracemalloc.start()
+
+    # Save the peak of the enclosing read and start a new frame
+    current, peak = self._get_memory()
+    if self._frames:
+      self._frames[-1]['peak'] = max(self._frames[-1]['peak'],peak)
+    if self.trace_memory:
+      tracemalloc.reset_peak()
+    frame = {'start': current, 'peak': current, 'nested_time': 0.0}
+    self._frames.append(frame)
+    start_time = time.perf_counter()
+
+    try:
+      yield file_stats
+    finally:
+      # Stop the clock before the memory is read
+      elapsed = time.perf_counter() - start_time
+      current, peak = self._get_memory()
+      self._frames.pop()
+
+      # Store the statistics and pass the time and peak to the enclosing read
+      frame['peak'] = max(frame['peak'],peak)
+      file_stats.time = elapsed - frame['nested_time']
+      file_stats.memory = frame['peak'] - frame['start']
+      if self._frames:
+        self._frames[-1]['nested_time'] += elapsed
+        self._frames[-1]['peak'] = max(self._frames[-1]['peak'],frame['peak'])
+      if started:
+        tracemalloc.stop()
+      self.files[name] = file_stats
+
+  # Add the time of a number of calls of a phase
+  def add_phase(self, name, elapsed, calls = 1):
+    count, total = self.phases.get(name,(0,0.0))
+    self.phases[name] = (count + calls,total + elapsed)
+
+  # Return the total time of all files
+  @property
+  def total_time(self):
+    return sum(file_stats.time for file_stats in self.files.values())
+
+  # Convert to dict
+  def as_dict(self):
+    return {
+      'files': [file_stats.as_dict() for file_stats in self.files.values()],
+      'phases': {name: {'count': count, 'time': total} for name, (count, total) in self.phases.items()},
+      'total_time': self.total_time
+    }
+
+  # Convert to string
+  def __str__(self):
+    lines = [str(file_stats) for file_stats in self.files.values()]
+    lines.extend("{:<16} {:>9.3f} s {:>10} calls".format(name,total,count) for name, (count, total) in self.phases.items())
+    lines.append("{:<16} {:>9.3f} s".format('total',self.total_time))
+    return "\n".join(lines)
@@ -1,10 +1,10 @@
-from iff.parser import Date, Record, File, Database
+from iff.parser import Date, Record, ReferenceRecord, File, Database
 from iff.delivery import IdentificationRecord
 
 from datetime import timedelta
 
 # Timezone record class
-class TimezoneRecord(Record):
+class TimezoneRecord(ReferenceRecord):
   # Read a record from a string
   @classmethod
   def read(cls, string):
@@ -1,8 +1,8 @@
-from iff.parser import Record, File, Database
+from iff.parser import ReferenceRecord, File, Database
 from iff.delivery import IdentificationRecord
 
 # Transport mode record
-class TransportModeRecord(Record):
+class TransportModeRecord(ReferenceRecord):
   # Read a record from a string
   @classmethod
   def read(cls, string, context):
@@ -1,12 +1,21 @@
 import iff
 import iff.model
+import iff.stats
 import random
 
 from datetime import date, timedelta
 
+import argparse
+
 # Main function
 def main():
-  tt = iff.IFF('ns-latest')
+  parser = argparse.ArgumentParser(description = "Print the services stopping at Utrecht Centraal")
+  parser.add_argument('directory',nargs = '?',default = 'ns-latest')
+  parser.add_argument('--profile',action = 'store_true',help = "print the time and peak memory growth it takes to read every file")
+  parser.add_argument('--trace-memory',action = 'store_true',help = "trace the memory allocations of every file, which slows reading down")
+  args = parser.parse_args()
+
+  tt = iff.IFF(args.directory,profile = iff.stats.LoadStats(trace_memory = True) if args.trace_memory else args.profile)
   today = date(2018,4,13)
 
   # Print total services
@@ -25,10 +34,14 @@ def main():
       print("{:>5}    {:>3}  {}".format(str(stop.departure_time),stop.departure_platform,str(service)))
 
     # Print upcoming stops
-    for s in service.slice_by_station(start = stop.station).stops:
-      if s.station != stop.station and not s.is_passing():
+    for s in service.slice_by_station(start = stop.station).stops[1:]:
+      if not s.is_passing():
         print("{}{}".format(" " * 16,str(s)))
 
+  # Print the load statistics
+  if tt.stats is not None:
+    print(tt.stats)
+
 
 # Execute the main function
 if __name__ == '__main__':
@@ -0,0 +1,160 @@
+import iff
+import iff.query
+
+from iff.parser import Date, Time
+from iff.search import StationSearch
+from urllib.parse import urlsplit, parse_qs
+
+import argparse
+import asyncio
+import json
+import threading
+import traceback
+
+# HTTP status reasons
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+# Parse a HH:MM time
+def parse_time(string):
+  hours, minutes = string.split(':')
+  return Time(int(hours),int(minutes))
+
+# Parse a YYYY-MM-DD date
+def parse_date(string):
+  year, month, day = string.split('-')
+  return Date(int(year),int(month),int(day))
+
+# Convert a time to a string, or None if there is no time
+def format_time(time):
+  return str(time) if time is not None else None
+
+# Convert a timetable to a list of board rows
+def format_board(timetable):
+  return [{
+    'arrival_time': format_time(stop.arrival_time),
+    'arrival_platform': stop.arrival_platform,
+    'departure_time': format_time(stop.departure_time),
+    'departure_platform': stop.departure_platform,
+    'service': service.id,
+    'name': service.name,
+    'company': str(service.company),
+    'transport_mode': str(service.transport_mode),
+    'origin': str(service.stops[0].station),
+    'destination': str(service.stops[-1].station)
+  } for stop, service in timetable]
+
+
+# Board server class
+class BoardServer:
+  # Constructor, where the requests are handled by the executor so queries do not block the event loop
+  def __init__(self, query, executor = None):
+    self.query = query
+    self.executor = executor
+    self._search = None
+    self._search_iff = None
+    self._search_lock = threading.Lock()
+
+  # Return the station search index of the current delivery, building it if the delivery changed
+  def get_search(self):
+    current = self.query.handle.current
+    with self._search_lock:
+      if self._search_iff is not current:
+        self._search = StationSearch(current.stations)
+        self._search_iff = current
+      return self._search
+
+  # Return the status and body for a request path
+  def handle(self, path):
+    url = urlsplit(path)
+    params = {name: values[0] for name, values in parse_qs(url.query).items()}
+
+    if url.path == '/stats':
+      return 200, self.query.get_stats()
+
+    elif url.path == '/stations':
+      # Parse the parameters
+      try:
+        k = int(params.get('k',10))
+      except ValueError as err:
+        return 400, {'error': "Invalid parameters: {}".format(err)}
+
+      # Return the matching stations
+      return 200, [{'id': station.id, 'name': station.name} for station in self.get_search().search(params.get('q',''),k)]
+
+    elif url.path == '/board':
+      # Parse the parameters
+      try:
+        station = self.query.handle.current.stations.get(params['station'])
+        date = parse_date(params['date'])
+        from_time = parse_time(params['from']) if 'from' in params else None
+        to_time = parse_time(params['to']) if 'to' in params else None
+        type = params.get('type','stops')
+      except (KeyError, ValueError) as err:
+        return 400, {'error': "Invalid parameters: {}".format(err)}
+
+      if station is None:
+        return 404, {'error': "Unknown station: {}".format(params['station'])}
+      if type not in iff.query.QUERY_TYPES:
+        return 400, {'error': "Invalid type: {}".format(type)}
+
+      # Return the board
+      return 200, format_board(self.query.query(type,date,station,from_time,to_time))
+
+    else:
+      return 404, {'error': "Not found: {}".format(url.path)}
+
+  # Handle a connection
+  async def handle_connection(self, reader, writer):
+    try:
+      # Read the request line and skip the headers
+      request_line = (await reader.readline()).decode('latin-1').split()
+      while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+        pass
+
+      # Handle the request in the executor, responding with an error if handling it failed
+      try:
+        if len(request_line) != 3:
+          status, body = 400, {'error': "Invalid request"}
+        elif request_line[0] != 'GET':
+          status, body = 405, {'error': "Method not allowed: {}".format(request_line[0])}
+        else:
+          status, body = await asyncio.get_running_loop().run_in_executor(self.executor,self.handle,request_line[1])
+        content = json.dumps(body).encode('utf-8')
+      except Exception:
+        traceback.print_exc()
+        status, content = 500, json.dumps({'error': "Internal server error"}).encode('utf-8')
+
+      # Write the response
+      writer.write("HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\nConnection: close\r\n\r\n".format(status,REASONS[status],len(content)).encode('latin-1'))
+      writer.write(content)
+      await writer.drain()
+    finally:
+      writer.close()
+
+  # Serve until cancelled
+  async def serve(self, host, port):
+    server = await asyncio.start_server(self.handle_connection,host,port)
+    async with server:
+      await server.serve_forever()
+
+
+# Main function
+def main():
+  parser = argparse.ArgumentParser(description = "Serve departure boards of an IFF delivery as JSON")
+  parser.add_argument('directory',nargs = '?',default = 'ns-latest')
+  parser.add_argument('--host',default = '127.0.0.1')
+  parser.add_argument('--port',type = int,default = 8080)
+  parser.add_argument('--cache-size',type = int,default = 4096)
+  parser.add_argument('--cache-ttl',type = float,default = 300)
+  args = parser.parse_args()
+
+  # Read the whole delivery before serving, so the first requests do not read it
+  query = iff.query.BoardQuery(iff.IFF(args.directory,lazy = False),args.cache_size,args.cache_ttl)
+  print("Serving boards on http://{}:{}/board".format(args.host,args.port))
+  asyncio.run(BoardServer(query).serve(args.host,args.port))
+
+
+# Execute the main function
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,83 @@
+from iff import IFF
+from iff.journey import INFINITY
+from iff.parser import Date, Time
+from iff.raptor import Raptor
+from benchmarks.synthetic import write_delivery
+
+import random
+import tempfile
+import unittest
+
+
+# Return the Pareto set of departure times, arrival times and transfers by trying every departure at the origin with plain rounds over the trips
+def brute_force(iff, date, origin, destination, from_time, to_time, max_transfers = 5):
+  valid_on = iff.services._valid_on(date)
+  change_times = {station.id: station.change_time for station in iff.stations.values()}
+
+  # Collect the stations and times of the valid trips
+  trips = []
+  for service in iff.services:
+    stops = [(stop.station.id,int(stop.arrival_time) if stop.is_arriving() else INFINITY,int(stop.departure_time) if stop.is_departing() else INFINITY)
+      for stop in service.stops if not stop.is_passing() and stop.station is not None]
+    if valid_on(service) and len(stops) > 1:
+      trips.append(stops)
+
+  # Run the rounds for every departure at the origin, never boarding at the origin again
+  journeys = []
+  for departure_time in sorted(set(departure for trip in trips for station_id, arrival, departure in trip[:-1] if station_id == origin.id and from_time <= departure <= to_time)):
+    ready = {origin.id: departure_time}
+    best = INFINITY
+    for round in range(max_transfers + 1):
+      arrivals = {}
+      for trip in trips:
+        boarded = False
+        for station_id, arrival, departure in trip:
+          if boarded and station_id != origin.id and arrival < arrivals.get(station_id,INFINITY):
+            arrivals[station_id] = arrival
+          if not boarded and ready.get(station_id,INFINITY) <= departure and (station_id != origin.id or departure == departure_time):
+            boarded = True
+      if arrivals.get(destination.id,INFINITY) < best:
+        best = arrivals[destination.id]
+        journeys.append((departure_time,best,round))
+      ready = {station_id: arrival + change_times[station_id] for station_id, arrival in arrivals.items()}
+
+  # Remove the dominated journeys
+  return sorted(journey for journey in journeys if not any(other != journey and other[0] >= journey[0] and other[1] <= journey[1] and other[2] <= journey[2] for other in journeys))
+
+
+# RAPTOR test class
+class RaptorTest(unittest.TestCase):
+  # Create the router for a synthetic delivery
+  @classmethod
+  def setUpClass(cls):
+    with tempfile.TemporaryDirectory() as directory:
+      write_delivery(directory,stations = 60,services = 2000,days = 30)
+      cls.iff = IFF(directory,lazy = False)
+    cls.raptor = Raptor(cls.iff.services,cls.iff.stations)
+    cls.date = Date(2018,1,3)
+
+  # Return the departure times, arrival times and transfers of a range query
+  def range_query(self, origin, destination, from_time, to_time):
+    return sorted((int(journey.departure_time),int(journey.arrival_time),journey.transfers) for journey in self.raptor.range_query(self.date,origin,destination,Time(0,from_time),Time(0,to_time)))
+
+  # Test that journeys do not return to the origin to catch a train after the window
+  def test_range_query_does_not_return_to_origin(self):
+    stations = self.iff.stations
+    for journey in self.raptor.range_query(self.date,stations['st15'],stations['st37'],Time(7,0),Time(9,0)):
+      self.assertTrue(Time(7,0) <= journey.departure_time <= Time(9,0))
+      for leg in journey.legs[1:]:
+        self.assertIsNot(leg.departure.station,stations['st15'])
+
+  # Test that range queries match a brute force search
+  def test_range_query_matches_brute_force(self):
+    generator = random.Random(1)
+    stations = list(self.iff.stations.values())
+    for query in range(20):
+      origin, destination = generator.sample(stations,2)
+      from_time = generator.randint(300,1200)
+      self.assertEqual(self.range_query(origin,destination,from_time,from_time + 120),brute_force(self.iff,self.date,origin,destination,from_time,from_time + 120))
+
+
+# Execute the tests
+if __name__ == '__main__':
+  unittest.main()
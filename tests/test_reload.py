@@ -0,0 +1,58 @@
+from iff import IFF
+from iff.parser import Date
+from iff.reload import update
+from benchmarks.synthetic import write_delivery
+
+import os
+import tempfile
+import unittest
+
+
+# Reload test class
+class ReloadTest(unittest.TestCase):
+  # Create a delivery and a newer version of it
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.old_directory = os.path.join(self.directory.name,'old')
+    self.new_directory = os.path.join(self.directory.name,'new')
+    write_delivery(self.old_directory,stations = 20,services = 200,days = 30)
+    write_delivery(self.new_directory,stations = 20,services = 200,days = 30,version = 2)
+    self.old = IFF(self.old_directory,lazy = False)
+
+  # Remove the deliveries
+  def tearDown(self):
+    self.directory.cleanup()
+
+  # Test that unchanged records are reused
+  def test_update_reuses_unchanged_records(self):
+    new, diff = update(self.old,self.new_directory)
+    self.assertIs(new.stations['st1'],self.old.stations['st1'])
+    self.assertIs(new.services[0],self.old.services[0])
+    self.assertEqual(diff.kept_services,len(self.old.services))
+
+  # Test that stations that reference a changed timezone reference the new timezone
+  def test_update_replaces_records_that_reference_changed_records(self):
+    file_name = os.path.join(self.new_directory,'timezone.dat')
+    with open(file_name) as file:
+      content = file.read()
+    with open(file_name,'w') as file:
+      file.write(content.replace('+00,','+01,'))
+
+    new, diff = update(self.old,self.new_directory)
+    fresh = IFF(self.new_directory,lazy = False)
+    station = new.stations['st1']
+    self.assertIsNot(station,self.old.stations['st1'])
+    self.assertIs(station.time_zone,new.timezones[0])
+    self.assertEqual(station.time_zone.offset,fresh.stations['st1'].time_zone.offset)
+
+    # Check that the services reference the new stations and give the same local times
+    date = Date(2018,1,3)
+    stop = new.services[0].stops[0]
+    self.assertIs(stop.station,new.stations[stop.station.id])
+    fresh_stop = fresh.services[0].stops[0]
+    self.assertEqual(new.services.for_date(date).get_datetime(stop),fresh.services.for_date(date).get_datetime(fresh_stop))
+
+
+# Execute the tests
+if __name__ == '__main__':
+  unittest.main()